@@ -0,0 +1,120 @@
+"""
+Module: database.py
+Description: Disposable databases for the offline benchmarks.
+
+``postgres`` starts a throwaway PostgreSQL server in a temporary directory through the
+optional ``pgserver`` package and creates the schema from ``queries/init.sql``.
+``sqlite`` is an embedded stand-in with the same tables, for machines without it.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import Engine, create_engine, event, text
+
+from src.utils.partitions import ensure_partitions
+from src.utils.sql_operators import get_query_from_sql_file
+
+Backend = Literal["postgres", "sqlite"]
+
+# First candle of the synthetic data, partitions are created from here on
+FUTURES_START = datetime(2019, 1, 1)
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE public.futures_ohlcv (
+        symbol TEXT NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        volume REAL NOT NULL,
+        PRIMARY KEY (symbol, timestamp)
+    )
+    """,
+    """
+    CREATE TABLE public.crypto_news (
+        id BIGINT PRIMARY KEY,
+        title TEXT NOT NULL,
+        published_at BIGINT NOT NULL,
+        url TEXT NOT NULL,
+        negative INTEGER NOT NULL DEFAULT 0,
+        positive INTEGER NOT NULL DEFAULT 0,
+        important INTEGER NOT NULL DEFAULT 0,
+        liked INTEGER NOT NULL DEFAULT 0,
+        disliked INTEGER NOT NULL DEFAULT 0,
+        lol INTEGER NOT NULL DEFAULT 0,
+        toxic INTEGER NOT NULL DEFAULT 0,
+        saved INTEGER NOT NULL DEFAULT 0,
+        comments INTEGER NOT NULL DEFAULT 0,
+        cluster_id BIGINT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX public.idx_crypto_news_published_at ON crypto_news(published_at)",
+]
+
+
+def default_backend() -> Backend:
+    """
+    Return "postgres" when ``pgserver`` is installed, "sqlite" otherwise.
+    """
+    try:
+        import pgserver  # noqa: F401
+    except ImportError:
+        return "sqlite"
+    return "postgres"
+
+
+def create_database(backend: Backend, directory: str) -> Engine:
+    """
+    Create an empty benchmark database with the project schema.
+
+    Parameters
+    ----------
+    backend : Literal["postgres", "sqlite"]
+        Database to start.
+    directory : str
+        Temporary directory for the database files.
+
+    Returns
+    -------
+    sqlalchemy.engine.Engine
+    """
+    if backend == "sqlite":
+        path = os.path.join(directory, "benchmark.db")
+        engine = create_engine("sqlite://")
+
+        # Untyped text() parameters must compare equal to the values written by to_sql
+        sqlite3.register_adapter(datetime, lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+        # upload() writes to the "public" schema, SQLite models schemas as attached databases
+        @event.listens_for(engine, "connect")
+        def attach_public(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"ATTACH DATABASE '{path}' AS public")
+
+        with engine.begin() as connection:
+            for statement in SQLITE_SCHEMA:
+                connection.execute(text(statement))
+        return engine
+
+    import pgserver
+
+    server = pgserver.get_server(os.path.join(directory, "pgdata"), cleanup_mode="delete")
+    engine = create_engine(server.get_uri())
+    with engine.begin() as connection:
+        connection.exec_driver_sql(get_query_from_sql_file("queries/init.sql"))
+    ensure_partitions(start=FUTURES_START, engine=engine)
+    return engine
+
+
+def truncate(engine: Engine, table_name: str) -> None:
+    """
+    Remove all rows of a benchmark table.
+    """
+    statement = "DELETE FROM {}" if engine.dialect.name == "sqlite" else "TRUNCATE {}"
+    with engine.begin() as connection:
+        connection.execute(text(statement.format(table_name)))
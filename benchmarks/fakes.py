@@ -0,0 +1,197 @@
+"""
+Module: fakes.py
+Description: Deterministic offline stand-ins for the BingX exchange and the CryptoPanic API.
+"""
+
+import copy
+import json
+import os
+import re
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+HOUR_MS = 3_600_000
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+NEWS_FIXTURE = os.path.join(FIXTURES_DIR, "cryptopanic_posts.json")
+
+
+def _ohlcv_arrays(symbol: str, timestamps: np.ndarray):
+    """
+    Deterministic candles for the given hourly timestamps.
+
+    Prices depend only on the symbol and the timestamp, so overlapping pages
+    and repeated runs always return identical values.
+    """
+    seed = zlib.crc32(symbol.encode()) % 1000
+    hours = timestamps // HOUR_MS
+    noise = ((hours * 2654435761 + seed) % 1000) / 1000.0
+    base = 100.0 + seed
+    close = base * (1 + 0.05 * np.sin(hours / 24.0) + 0.01 * np.sin(hours / 7.3 + seed))
+    open_ = close * (1 + (noise - 0.5) / 200)
+    high = np.maximum(open_, close) * (1 + noise / 100)
+    low = np.minimum(open_, close) * (1 - noise / 100)
+    volume = 1000.0 + 500.0 * noise
+    return open_, high, low, close, volume
+
+
+class FakeExchange:
+    """
+    Offline subset of the ccxt exchange API used by ``src.lib.futures_data``.
+
+    Parameters
+    ----------
+    end_ms : int, optional
+        Last available candle, in milliseconds. Default is the previous full hour.
+    page_limit : int, optional
+        Maximum candles per ``fetch_ohlcv`` call, like the exchange. Default is 1000.
+    missing_hours : list of (int, int), optional
+        Half-open ``[start_ms, end_ms)`` ranges the exchange has no candles for.
+    """
+
+    parse8601 = staticmethod(ccxt.Exchange.parse8601)
+
+    def __init__(
+        self,
+        end_ms: Optional[int] = None,
+        page_limit: int = 1000,
+        missing_hours: Optional[List[tuple]] = None,
+    ):
+        if end_ms is None:
+            now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            end_ms = int((now - timedelta(hours=1)).timestamp() * 1000)
+        self.end_ms = end_ms
+        self.page_limit = page_limit
+        self.missing_hours = missing_hours or []
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe="1h", since=None, limit=None):
+        if timeframe != "1h":
+            raise ValueError(f"FakeExchange only serves 1h candles, got {timeframe}")
+
+        self.calls += 1
+        limit = min(limit or self.page_limit, self.page_limit)
+        if since is None:
+            since = self.end_ms - (limit - 1) * HOUR_MS
+        since = -(-since // HOUR_MS) * HOUR_MS
+
+        count = max(0, min(limit, (self.end_ms - since) // HOUR_MS + 1))
+        timestamps = since + HOUR_MS * np.arange(count, dtype=np.int64)
+        for start_ms, end_ms in self.missing_hours:
+            timestamps = timestamps[(timestamps < start_ms) | (timestamps >= end_ms)]
+
+        columns = _ohlcv_arrays(symbol, timestamps)
+        return [list(row) for row in zip(timestamps.tolist(), *(c.tolist() for c in columns))]
+
+
+def synthetic_candles(size: int, start: str = "2019-01-01", hours_per_symbol: int = 43800):
+    """
+    Build ``size`` candles in the ``futures_ohlcv`` layout without going through the exchange.
+
+    Candles are spread over as many symbols as needed so that each symbol covers
+    at most ``hours_per_symbol`` consecutive hours from ``start``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``timestamp`` (datetime), ``open``, ``high``, ``low``, ``close``,
+        ``volume`` and ``symbol``.
+    """
+    start_ms = FakeExchange.parse8601(f"{start}T00:00:00Z")
+    frames = []
+    for index, offset in enumerate(range(0, size, hours_per_symbol)):
+        symbol = f"SYM{index:04d}/USDT:USDT"
+        count = min(hours_per_symbol, size - offset)
+        timestamps = start_ms + HOUR_MS * np.arange(count, dtype=np.int64)
+        open_, high, low, close, volume = _ohlcv_arrays(symbol, timestamps)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "timestamp": pd.to_datetime(timestamps, unit="ms"),
+                    "open": open_,
+                    "high": high,
+                    "low": low,
+                    "close": close,
+                    "volume": volume,
+                    "symbol": symbol,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def make_news_payload(size: int, fixture_path: str = NEWS_FIXTURE) -> dict:
+    """
+    Build a CryptoPanic ``/posts/`` response with ``size`` posts from the fixture page.
+
+    Posts cycle through the fixture items with fresh ids, one minute apart.
+    """
+    with open(fixture_path, "r", encoding="utf-8") as fixture_file:
+        page = json.load(fixture_file)
+
+    templates = page["results"]
+    newest = datetime.fromisoformat(templates[0]["published_at"].replace("Z", "+00:00"))
+    first_id = templates[0]["id"]
+
+    results = []
+    for index in range(size):
+        post = copy.deepcopy(templates[index % len(templates)])
+        published_at = newest - timedelta(minutes=index)
+        post["id"] = first_id - index
+        post["published_at"] = published_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+        post["created_at"] = post["published_at"]
+        results.append(post)
+
+    return {"count": size, "next": None, "previous": None, "results": results}
+
+
+class FakeResponse:
+    """
+    Minimal ``requests.Response`` replacement.
+    """
+
+    def __init__(self, payload: dict, status_code: int = 200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class FakeNewsSession:
+    """
+    Serves a fixed set of posts page by page, like the CryptoPanic API.
+
+    Parameters
+    ----------
+    payload : dict
+        Full response as built by ``make_news_payload``.
+    page_size : int, optional
+        Posts per page. Default is 20, as in the API.
+    """
+
+    def __init__(self, payload: dict, page_size: int = 20):
+        self.results = payload["results"]
+        self.page_size = page_size
+        self.calls = 0
+
+    def get(self, url: str) -> FakeResponse:
+        self.calls += 1
+        match = re.search(r"[?&]page=(\d+)", url)
+        page = int(match.group(1)) if match else 1
+        start = (page - 1) * self.page_size
+        results = self.results[start : start + self.page_size]
+        if not results and page > 1:
+            return FakeResponse({"status": "Not found"}, status_code=404)
+        return FakeResponse(
+            {"count": len(self.results), "next": None, "previous": None, "results": results}
+        )
@@ -0,0 +1,408 @@
+"""
+Module: run.py
+Description: Offline benchmarks of the ingestion, dedup and read paths.
+
+Usage::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000 10000 100000 1000000 10000000 --cases process_news
+    python -m benchmarks.run --save-baseline
+
+Every case runs against deterministic fakes (``benchmarks/fakes.py``) and a disposable
+database (``benchmarks/database.py``), no network access or configured database is needed.
+Throughput (rows/sec, best of ``--repeat`` runs) and peak traced memory are compared with
+``benchmarks/baselines.json`` and the process exits with 1 if a case regressed by more than
+``--tolerance``.
+
+Absolute throughput depends on the host, so every run first times fixed reference workloads
+(pandas work and database round trips, see ``calibrate``). Baselines store the calibration of
+the host that saved them, and a case is compared with its baseline scaled by the speed ratio
+of the two hosts for the resource it mostly uses.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from benchmarks.database import create_database, default_backend, truncate
+from benchmarks.fakes import FakeExchange, FakeNewsSession, make_news_payload, synthetic_candles
+from src.lib.crypto_news import get_latest_crypto_news, process_news
+from src.lib.futures_data import bingx_futures_date_range_1h
+from src.utils.loggerring import logger
+from src.utils.query_registry import QUERIES
+from src.utils.sql_operators import upload_without_duplicates
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# Longest history fetched per symbol in the exchange case, about five years
+MAX_DAYS_PER_SYMBOL = 1825
+
+# Quick cases are repeated until their timed runs add up to this, single runs of a few
+# milliseconds are dominated by noise
+MIN_TIMED_SECONDS = 0.5
+MAX_REPEAT = 50
+
+# Rows of the reference workloads timed by calibrate
+CALIBRATION_ROWS = 50_000
+CALIBRATION_DB_ROWS = 5_000
+
+# Peak memory growth below this is noise (baselines are rounded to 0.01 MB)
+PEAK_MB_SLACK = 0.1
+
+
+@dataclass
+class Case:
+    """
+    A benchmark case.
+
+    ``setup(size, engine)`` prepares the input outside of the timed section and
+    returns a callable that runs the measured code and returns the rows processed.
+    ``resource`` is what bounds the case ("cpu" or "db"), it selects the calibration
+    its baseline is scaled with.
+    """
+
+    name: str
+    setup: Callable[[int, object], Callable[[], int]]
+    resource: Literal["cpu", "db"] = "cpu"
+
+
+def setup_futures_range(size, engine):
+    days = min(math.ceil(size / 24), MAX_DAYS_PER_SYMBOL)
+    symbols = [f"SYM{i:04d}/USDT:USDT" for i in range(math.ceil(size / (days * 24)))]
+    end_date = (pd.Timestamp("2019-01-01") + pd.Timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    exchange = FakeExchange()
+
+    def run():
+        return sum(
+            len(bingx_futures_date_range_1h("2019-01-01", end_date, symbol, exchange=exchange))
+            for symbol in symbols
+        )
+
+    return run
+
+
+def setup_fetch_news(size, engine):
+    session = FakeNewsSession(make_news_payload(size))
+    pages = math.ceil(size / session.page_size)
+
+    def run():
+        return sum(
+            len(get_latest_crypto_news("BTC", page, session=session)["results"])
+            for page in range(1, pages + 1)
+        )
+
+    return run
+
+
+def setup_process_news(size, engine):
+    payload = make_news_payload(size)
+
+    def run():
+        return len(process_news(payload))
+
+    return run
+
+
+def setup_upload_futures(size, engine):
+    candles = synthetic_candles(size)
+    truncate(engine, "futures_ohlcv")
+
+    def run():
+        upload_without_duplicates(candles, table_name="futures_ohlcv", engine=engine)
+        return len(candles)
+
+    return run
+
+
+def setup_dedup_futures(size, engine):
+    candles = synthetic_candles(size)
+    truncate(engine, "futures_ohlcv")
+    upload_without_duplicates(candles, table_name="futures_ohlcv", engine=engine)
+
+    def run():
+        upload_without_duplicates(candles, table_name="futures_ohlcv", engine=engine)
+        return len(candles)
+
+    return run
+
+
+def setup_select_latest(size, engine):
+    candles = synthetic_candles(size)
+    truncate(engine, "futures_ohlcv")
+    upload_without_duplicates(candles, table_name="futures_ohlcv", engine=engine)
+    symbols = candles["symbol"].unique().tolist()
+
+    def run():
+        return sum(
+            len(QUERIES.select("latest_futures_data", engine=engine, symbol=symbol))
+            for symbol in symbols
+        )
+
+    return run
+
+
+CASES: Dict[str, Case] = {
+    case.name: case
+    for case in [
+        Case("futures_range", setup_futures_range),
+        Case("fetch_news", setup_fetch_news),
+        Case("process_news", setup_process_news),
+        Case("upload_futures", setup_upload_futures, "db"),
+        Case("dedup_futures", setup_dedup_futures, "db"),
+        Case("select_latest", setup_select_latest, "db"),
+    ]
+}
+
+
+def best_time(setup: Callable[[], Callable[[], int]], repeat: int) -> Tuple[int, float]:
+    """
+    Time ``repeat`` runs, or more until they add up to ``MIN_TIMED_SECONDS``.
+
+    Returns
+    -------
+    Tuple[int, float]
+        Rows processed by a run and the seconds of the fastest run.
+    """
+    best, timed, runs, rows = math.inf, 0.0, 0, 0
+    while runs < repeat or (timed < MIN_TIMED_SECONDS and runs < MAX_REPEAT):
+        run = setup()
+        started = time.perf_counter()
+        rows = run()
+        elapsed = time.perf_counter() - started
+        best, timed, runs = min(best, elapsed), timed + elapsed, runs + 1
+    return rows, best
+
+
+def calibrate(engine, repeat: int) -> Dict[str, float]:
+    """
+    Throughput of fixed reference workloads on this host.
+
+    ``cpu`` sorts, aggregates and serialises synthetic candles with pandas, ``db`` writes
+    and reads them back through the benchmark database. Neither uses project code, so
+    they only change with the host and the backend.
+
+    Returns
+    -------
+    Dict[str, float]
+        Rows/sec per resource.
+    """
+    candles = synthetic_candles(CALIBRATION_ROWS)
+    sample = candles.iloc[:CALIBRATION_DB_ROWS]
+
+    def cpu():
+        candles.sort_values("close").groupby("symbol")["volume"].sum()
+        candles.to_json(orient="records")
+        return len(candles)
+
+    def setup_db():
+        truncate(engine, "futures_ohlcv")
+
+        def run():
+            with engine.begin() as connection:
+                sample.to_sql(
+                    "futures_ohlcv",
+                    connection,
+                    schema="public",
+                    index=False,
+                    if_exists="append",
+                    method="multi",
+                    chunksize=1000,
+                )
+                pd.read_sql(text("SELECT * FROM futures_ohlcv"), connection)
+            return len(sample)
+
+        return run
+
+    calibration = {}
+    for resource, setup in [("cpu", lambda: cpu), ("db", setup_db)]:
+        rows, seconds = best_time(setup, repeat)
+        calibration[resource] = rows / seconds
+    truncate(engine, "futures_ohlcv")
+    return calibration
+
+
+def measure(case: Case, size: int, engine, repeat: int, memory: bool) -> dict:
+    """
+    Run one case at one size.
+
+    Returns
+    -------
+    dict
+        ``rows``, ``seconds`` (best run), ``rows_per_sec`` and ``peak_mb``
+        (None when memory tracing is off).
+    """
+    rows, best = best_time(lambda: case.setup(size, engine), repeat)
+
+    peak_mb = None
+    if memory:
+        # Separate traced run, tracemalloc slows allocations down noticeably
+        run = case.setup(size, engine)
+        tracemalloc.start()
+        run()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "seconds": best,
+        "rows_per_sec": rows / best if best > 0 else math.inf,
+        "peak_mb": peak_mb,
+    }
+
+
+def load_baselines(path: str = BASELINES_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baselines(
+    results: pd.DataFrame, calibration: Dict[str, float], backend: str, path: str = BASELINES_PATH
+) -> None:
+    """
+    Merge the results into the baseline file, keyed by backend, case and size.
+
+    The calibration of this host is stored under the backend's ``calibration`` key.
+    """
+    baselines = load_baselines(path)
+    baselines.setdefault(backend, {})["calibration"] = {
+        resource: round(rate, 1) for resource, rate in calibration.items()
+    }
+    for row in results.itertuples():
+        entry = {"rows_per_sec": round(row.rows_per_sec, 1)}
+        if row.peak_mb is not None and not pd.isna(row.peak_mb):
+            entry["peak_mb"] = round(row.peak_mb, 2)
+        baselines.setdefault(backend, {}).setdefault(row.case, {})[str(row.size)] = entry
+
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def host_speedup(
+    calibration: Dict[str, float], baseline_calibration: Optional[Dict[str, float]], resource: str
+) -> float:
+    """
+    Speed of this host relative to the one that saved the baselines, 1.0 if unknown.
+    """
+    if not baseline_calibration or not baseline_calibration.get(resource):
+        return 1.0
+    return calibration[resource] / baseline_calibration[resource]
+
+
+def compare(
+    results: pd.DataFrame,
+    baselines: dict,
+    backend: str,
+    tolerance: float,
+    calibration: Dict[str, float],
+) -> pd.DataFrame:
+    """
+    Add baseline columns and a ``regression`` flag to the results.
+
+    The baseline throughput is first scaled by ``host_speedup`` of the case's resource.
+    A case regresses when its throughput drops below ``(1 - tolerance)`` of the scaled
+    baseline (``ratio`` column) or its peak memory grows above ``(1 + tolerance)`` of it
+    plus ``PEAK_MB_SLACK``.
+    """
+    results = results.copy()
+    backend_baselines = baselines.get(backend, {})
+    base_rate, ratios, base_peak, regression = [], [], [], []
+    for row in results.itertuples():
+        baseline = backend_baselines.get(row.case, {}).get(str(row.size), {})
+        speedup = host_speedup(
+            calibration, backend_baselines.get("calibration"), CASES[row.case].resource
+        )
+        rate = baseline.get("rows_per_sec")
+        rate = None if rate is None else rate * speedup
+        peak = baseline.get("peak_mb")
+        base_rate.append(rate)
+        ratios.append(None if rate is None else row.rows_per_sec / rate)
+        base_peak.append(peak)
+        slower = rate is not None and row.rows_per_sec < rate * (1 - tolerance)
+        bigger = (
+            peak is not None
+            and row.peak_mb is not None
+            and not pd.isna(row.peak_mb)
+            and row.peak_mb > peak * (1 + tolerance) + PEAK_MB_SLACK
+        )
+        regression.append(slower or bigger)
+
+    results["baseline_rows_per_sec"] = base_rate
+    results["ratio"] = ratios
+    results["baseline_peak_mb"] = base_peak
+    results["regression"] = regression
+    return results
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=default_backend())
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case and size")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced memory run")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline-file", default=BASELINES_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    # Per-upload info lines and expected "no new entries" warnings would drown the report
+    logger.setLevel(logging.ERROR)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database(args.backend, directory)
+        calibration = calibrate(engine, args.repeat)
+        print(
+            "calibration: "
+            + ", ".join(f"{resource} {rate:,.0f} rows/s" for resource, rate in calibration.items()),
+            flush=True,
+        )
+        for name in args.cases:
+            for size in args.sizes:
+                result = measure(CASES[name], size, engine, args.repeat, not args.no_memory)
+                rows.append({"case": name, "size": size, **result})
+                print(
+                    f"{name:>16} {size:>10,} rows: {result['rows_per_sec']:>14,.0f} rows/s",
+                    flush=True,
+                )
+        engine.dispose()
+
+    results = pd.DataFrame(rows)
+    if args.save_baseline:
+        save_baselines(results, calibration, args.backend, args.baseline_file)
+        print(f"Saved baselines for {args.backend} to {args.baseline_file}")
+        return 0
+
+    report = compare(
+        results, load_baselines(args.baseline_file), args.backend, args.tolerance, calibration
+    )
+    print(report.to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+
+    regressions = report[report["regression"]]
+    if not regressions.empty:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} of the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
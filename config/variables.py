@@ -21,3 +21,36 @@ CRYPTO_PANIC_API_KEY = os.getenv("CRYPTO_PANIC_API_KEY", "")
 CRYPTO_PANIC_BASE_URL = "https://cryptopanic.com/api/v1/posts/?auth_token={}".format(
     CRYPTO_PANIC_API_KEY
 )
+
+# Background refresh, see src/lib/scheduler.py
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+FUTURES_SYMBOLS = os.getenv("FUTURES_SYMBOLS", "BTC/USDT:USDT,ETH/USDT:USDT,SOL/USDT:USDT").split(
+    ","
+)
+NEWS_CURRENCIES = os.getenv("NEWS_CURRENCIES", "BTC,ETH,SOL").split(",")
+FUTURES_REFRESH_SECONDS = int(os.getenv("FUTURES_REFRESH_SECONDS", "900"))
+NEWS_REFRESH_SECONDS = int(os.getenv("NEWS_REFRESH_SECONDS", "300"))
+FUTURES_BACKFILL_DAYS = int(os.getenv("FUTURES_BACKFILL_DAYS", "10"))
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+# Near-duplicate news clusters, see src/lib/news_dedup.py
+NEWS_DEDUP_THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.5"))
+NEWS_DEDUP_WINDOW_HOURS = float(os.getenv("NEWS_DEDUP_WINDOW_HOURS", "48"))
+
+# Similar-news index, see src/lib/news_index.py
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+NEWS_INDEX_PATH = os.getenv("NEWS_INDEX_PATH", "data/news_index.npz")
+NEWS_INDEX_NPROBE = int(os.getenv("NEWS_INDEX_NPROBE", "64"))
+
+# Cached read responses of the API, see src/utils/http_cache.py
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "1024"))
+HTTP_CACHE_TTL_SECONDS = float(os.getenv("HTTP_CACHE_TTL_SECONDS", "60"))
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Monthly partitions of futures_ohlcv, see src/utils/partitions.py
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))  # 0 keeps all
+PARTITION_ARCHIVE_SCHEMA = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+PARTITION_MAINTENANCE_SECONDS = int(os.getenv("PARTITION_MAINTENANCE_SECONDS", "86400"))
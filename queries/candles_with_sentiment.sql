@@ -0,0 +1,24 @@
+SELECT
+    candle.timestamp,
+    candle.open,
+    candle.high,
+    candle.low,
+    candle.close,
+    candle.volume,
+    COALESCE(bar.news, 0) AS news,
+    COALESCE(bar.clusters, 0) AS clusters,
+    COALESCE(bar.negative, 0) AS negative,
+    COALESCE(bar.positive, 0) AS positive,
+    COALESCE(bar.important, 0) AS important,
+    COALESCE(bar.liked, 0) AS liked,
+    COALESCE(bar.disliked, 0) AS disliked,
+    COALESCE(bar.lol, 0) AS lol,
+    COALESCE(bar.toxic, 0) AS toxic,
+    COALESCE(bar.saved, 0) AS saved,
+    COALESCE(bar.comments, 0) AS comments
+FROM futures_ohlcv AS candle
+LEFT JOIN news_sentiment_hourly AS bar
+    ON bar.currency = '{currency}' AND bar.hour = candle.timestamp
+WHERE candle.symbol = '{symbol}'
+    AND candle.timestamp BETWEEN '{start}' AND '{end}'
+ORDER BY candle.timestamp
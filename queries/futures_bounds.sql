@@ -0,0 +1,6 @@
+SELECT
+    MIN(timestamp) AS first_timestamp,
+    MAX(timestamp) AS last_timestamp,
+    COUNT(*) AS candles
+FROM futures_ohlcv
+WHERE symbol = '{symbol}'
@@ -0,0 +1,25 @@
+WITH candles AS (
+    SELECT timestamp
+    FROM futures_ohlcv
+    WHERE symbol = '{symbol}'
+        AND timestamp >= CAST('{start}' AS TIMESTAMP)
+        AND timestamp <= CAST('{end}' AS TIMESTAMP)
+    -- Sentinels one hour outside the grid, so leading and trailing gaps are found too
+    UNION ALL
+    SELECT CAST('{start}' AS TIMESTAMP) - INTERVAL '1 hour'
+    UNION ALL
+    SELECT CAST('{end}' AS TIMESTAMP) + INTERVAL '1 hour'
+),
+steps AS (
+    SELECT
+        timestamp,
+        LEAD(timestamp) OVER (ORDER BY timestamp) AS next_timestamp
+    FROM candles
+)
+SELECT
+    timestamp + INTERVAL '1 hour' AS gap_start,
+    next_timestamp - INTERVAL '1 hour' AS gap_end,
+    CAST(EXTRACT(EPOCH FROM next_timestamp - timestamp) / 3600 AS INTEGER) - 1 AS missing_hours
+FROM steps
+WHERE next_timestamp - timestamp > INTERVAL '1 hour'
+ORDER BY gap_start
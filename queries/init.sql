@@ -1,19 +1,33 @@
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE schema_migrations IS 'Tracks applied schema migrations (see src/utils/migrations.py)';
+
 CREATE TABLE IF NOT EXISTS futures_ohlcv (
-    id SERIAL PRIMARY KEY,
     symbol VARCHAR(255) NOT NULL,
     timestamp TIMESTAMP NOT NULL,
     open DOUBLE PRECISION NOT NULL,
     high DOUBLE PRECISION NOT NULL,
     low DOUBLE PRECISION NOT NULL,
     close DOUBLE PRECISION NOT NULL,
-    volume DOUBLE PRECISION NOT NULL
-);
+    volume DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (symbol, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catches rows outside the monthly partitions created by src/utils/partitions.py
+CREATE TABLE IF NOT EXISTS futures_ohlcv_default PARTITION OF futures_ohlcv DEFAULT;
 
-CREATE INDEX idx_futures_ohlcv_symbol ON futures_ohlcv(symbol);
-CREATE INDEX idx_futures_ohlcv_timestamp ON futures_ohlcv(timestamp);
-CREATE INDEX idx_futures_ohlcv_symbol_timestamp ON futures_ohlcv(symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_futures_ohlcv_timestamp_brin
+    ON futures_ohlcv USING BRIN (timestamp) WITH (pages_per_range = 32);
 
-COMMENT ON TABLE futures_ohlcv IS 'Stores cryptocurrency futures OHLCV (Open, High, Low, Close, Volume) time series data';
+COMMENT ON TABLE futures_ohlcv IS 'Stores cryptocurrency futures OHLCV (Open, High, Low, Close, Volume) time series data, partitioned by month';
+
+INSERT INTO schema_migrations (version, name)
+VALUES (1, 'futures_ohlcv_partitioned')
+ON CONFLICT (version) DO NOTHING;
 
 CREATE TABLE IF NOT EXISTS crypto_news (
     id BIGINT PRIMARY KEY,
@@ -29,9 +43,65 @@ CREATE TABLE IF NOT EXISTS crypto_news (
     toxic INTEGER NOT NULL DEFAULT 0,
     saved INTEGER NOT NULL DEFAULT 0,
     comments INTEGER NOT NULL DEFAULT 0,
+    cluster_id BIGINT,  -- id of the first item of the story, see src/lib/news_dedup.py
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_crypto_news_published_at ON crypto_news(published_at);
 CREATE INDEX idx_crypto_news_title ON crypto_news(title);
+CREATE INDEX IF NOT EXISTS idx_crypto_news_cluster_id ON crypto_news(cluster_id);
 COMMENT ON TABLE crypto_news IS 'Stores cryptocurrency news articles with engagement metrics from CryptoPanic API';
+
+INSERT INTO schema_migrations (version, name)
+VALUES (2, 'crypto_news_cluster_id')
+ON CONFLICT (version) DO NOTHING;
+
+-- Currencies a news item was fetched for, a story can be tagged with several
+CREATE TABLE IF NOT EXISTS crypto_news_currency (
+    news_id BIGINT NOT NULL,
+    currency VARCHAR(16) NOT NULL,
+    PRIMARY KEY (currency, news_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crypto_news_currency_news_id ON crypto_news_currency(news_id);
+
+CREATE TABLE IF NOT EXISTS news_sentiment_hourly (
+    currency VARCHAR(16) NOT NULL,
+    hour TIMESTAMP NOT NULL,  -- UTC, aligned with futures_ohlcv.timestamp
+    news INTEGER NOT NULL,
+    clusters INTEGER NOT NULL,
+    negative BIGINT NOT NULL,
+    positive BIGINT NOT NULL,
+    important BIGINT NOT NULL,
+    liked BIGINT NOT NULL,
+    disliked BIGINT NOT NULL,
+    lol BIGINT NOT NULL,
+    toxic BIGINT NOT NULL,
+    saved BIGINT NOT NULL,
+    comments BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (currency, hour)
+);
+
+COMMENT ON TABLE news_sentiment_hourly IS 'Hourly sums of crypto_news votes per currency, maintained on ingest (see src/lib/news_sentiment.py)';
+
+INSERT INTO schema_migrations (version, name)
+VALUES (3, 'news_sentiment_hourly')
+ON CONFLICT (version) DO NOTHING;
+
+-- Checkpoints of python -m src.lib.bulk_import, one row per imported file
+CREATE TABLE IF NOT EXISTS bulk_import_progress (
+    path TEXT PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    file_size BIGINT NOT NULL,
+    file_mtime BIGINT NOT NULL,
+    rows_done BIGINT NOT NULL DEFAULT 0,
+    rows_inserted BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+INSERT INTO schema_migrations (version, name)
+VALUES (4, 'bulk_import_progress')
+ON CONFLICT (version) DO NOTHING;
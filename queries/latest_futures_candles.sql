@@ -0,0 +1,12 @@
+SELECT
+    symbol,
+    timestamp,
+    open,
+    high,
+    low,
+    close,
+    volume
+FROM futures_ohlcv
+WHERE symbol = '{symbol}'
+ORDER BY timestamp DESC
+LIMIT {limit}
@@ -1,4 +1,19 @@
-SELECT *
+SELECT
+    id,
+    title,
+    published_at,
+    url,
+    negative,
+    positive,
+    important,
+    liked,
+    disliked,
+    lol,
+    toxic,
+    saved,
+    comments,
+    cluster_id,
+    created_at
 FROM crypto_news
 ORDER BY published_at DESC
 LIMIT 10
@@ -0,0 +1,3 @@
+INSERT INTO crypto_news_currency (news_id, currency)
+SELECT UNNEST(:ids), :currency
+ON CONFLICT DO NOTHING
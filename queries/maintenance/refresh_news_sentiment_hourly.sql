@@ -0,0 +1,38 @@
+INSERT INTO news_sentiment_hourly (
+    currency, hour, news, clusters,
+    negative, positive, important, liked, disliked, lol, toxic, saved, comments, updated_at
+)
+SELECT
+    link.currency,
+    date_trunc('hour', to_timestamp(news.published_at) AT TIME ZONE 'UTC') AS hour,
+    COUNT(*),
+    COUNT(DISTINCT COALESCE(news.cluster_id, news.id)),
+    SUM(news.negative),
+    SUM(news.positive),
+    SUM(news.important),
+    SUM(news.liked),
+    SUM(news.disliked),
+    SUM(news.lol),
+    SUM(news.toxic),
+    SUM(news.saved),
+    SUM(news.comments),
+    CURRENT_TIMESTAMP
+FROM crypto_news AS news
+JOIN crypto_news_currency AS link ON link.news_id = news.id
+WHERE link.currency = :currency
+    AND news.published_at >= :start
+    AND news.published_at < :end
+GROUP BY link.currency, hour
+ON CONFLICT (currency, hour) DO UPDATE SET
+    news = EXCLUDED.news,
+    clusters = EXCLUDED.clusters,
+    negative = EXCLUDED.negative,
+    positive = EXCLUDED.positive,
+    important = EXCLUDED.important,
+    liked = EXCLUDED.liked,
+    disliked = EXCLUDED.disliked,
+    lol = EXCLUDED.lol,
+    toxic = EXCLUDED.toxic,
+    saved = EXCLUDED.saved,
+    comments = EXCLUDED.comments,
+    updated_at = EXCLUDED.updated_at
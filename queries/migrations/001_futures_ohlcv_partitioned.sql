@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS {table} (
+    symbol VARCHAR(255) NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    open DOUBLE PRECISION NOT NULL,
+    high DOUBLE PRECISION NOT NULL,
+    low DOUBLE PRECISION NOT NULL,
+    close DOUBLE PRECISION NOT NULL,
+    volume DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (symbol, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS {default_partition} PARTITION OF {table} DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_futures_ohlcv_timestamp_brin
+    ON {table} USING BRIN (timestamp) WITH (pages_per_range = 32);
@@ -0,0 +1,6 @@
+ALTER TABLE crypto_news ADD COLUMN IF NOT EXISTS cluster_id BIGINT;
+
+-- Existing news start as their own clusters, see src/lib/news_dedup.py recluster_news
+UPDATE crypto_news SET cluster_id = id WHERE cluster_id IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_crypto_news_cluster_id ON crypto_news(cluster_id);
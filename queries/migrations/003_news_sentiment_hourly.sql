@@ -0,0 +1,28 @@
+-- Currencies a news item was fetched for, a story can be tagged with several
+CREATE TABLE IF NOT EXISTS crypto_news_currency (
+    news_id BIGINT NOT NULL,
+    currency VARCHAR(16) NOT NULL,
+    PRIMARY KEY (currency, news_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crypto_news_currency_news_id ON crypto_news_currency(news_id);
+
+CREATE TABLE IF NOT EXISTS news_sentiment_hourly (
+    currency VARCHAR(16) NOT NULL,
+    hour TIMESTAMP NOT NULL,  -- UTC, aligned with futures_ohlcv.timestamp
+    news INTEGER NOT NULL,
+    clusters INTEGER NOT NULL,
+    negative BIGINT NOT NULL,
+    positive BIGINT NOT NULL,
+    important BIGINT NOT NULL,
+    liked BIGINT NOT NULL,
+    disliked BIGINT NOT NULL,
+    lol BIGINT NOT NULL,
+    toxic BIGINT NOT NULL,
+    saved BIGINT NOT NULL,
+    comments BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (currency, hour)
+);
+
+COMMENT ON TABLE news_sentiment_hourly IS 'Hourly sums of crypto_news votes per currency, maintained on ingest (see src/lib/news_sentiment.py)';
@@ -0,0 +1,12 @@
+-- Checkpoints of python -m src.lib.bulk_import, one row per imported file
+CREATE TABLE IF NOT EXISTS bulk_import_progress (
+    path TEXT PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    file_size BIGINT NOT NULL,
+    file_mtime BIGINT NOT NULL,
+    rows_done BIGINT NOT NULL DEFAULT 0,
+    rows_inserted BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
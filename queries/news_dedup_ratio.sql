@@ -0,0 +1,5 @@
+SELECT
+    COUNT(*) AS news,
+    COUNT(DISTINCT cluster_id) AS clusters
+FROM crypto_news
+WHERE published_at >= {since}
@@ -0,0 +1,8 @@
+SELECT
+    id,
+    title,
+    published_at,
+    cluster_id
+FROM crypto_news
+WHERE published_at >= {since}
+ORDER BY published_at, id
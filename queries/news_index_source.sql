@@ -0,0 +1,8 @@
+SELECT
+    id,
+    title,
+    published_at
+FROM crypto_news
+WHERE published_at >= {since}
+    AND (cluster_id IS NULL OR cluster_id = id)
+ORDER BY published_at, id
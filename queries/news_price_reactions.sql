@@ -0,0 +1,30 @@
+WITH news AS (
+    SELECT
+        id,
+        title,
+        published_at,
+        url,
+        cluster_id,
+        date_trunc('hour', to_timestamp(published_at) AT TIME ZONE 'UTC') AS hour
+    FROM crypto_news
+    WHERE id = ANY({ids})
+)
+SELECT
+    news.id,
+    news.title,
+    news.published_at,
+    news.url,
+    news.cluster_id,
+    base.close,
+    after_1h.close / base.close - 1 AS reaction_1h,
+    after_6h.close / base.close - 1 AS reaction_6h,
+    after_24h.close / base.close - 1 AS reaction_24h
+FROM news
+LEFT JOIN futures_ohlcv AS base
+    ON base.symbol = '{symbol}' AND base.timestamp = news.hour
+LEFT JOIN futures_ohlcv AS after_1h
+    ON after_1h.symbol = '{symbol}' AND after_1h.timestamp = news.hour + INTERVAL '1 hour'
+LEFT JOIN futures_ohlcv AS after_6h
+    ON after_6h.symbol = '{symbol}' AND after_6h.timestamp = news.hour + INTERVAL '6 hours'
+LEFT JOIN futures_ohlcv AS after_24h
+    ON after_24h.symbol = '{symbol}' AND after_24h.timestamp = news.hour + INTERVAL '24 hours'
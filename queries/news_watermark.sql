@@ -0,0 +1,2 @@
+SELECT MAX(published_at) AS last_published_at
+FROM crypto_news
@@ -0,0 +1,515 @@
+"""
+Module: bulk_import.py
+Description: Bulk import of historical candle and news archives into PostgreSQL.
+
+Usage::
+
+    python -m src.lib.bulk_import data/BTC_USDT_USDT_1h_ohlcv.csv data/ETH_USDT_USDT_1h_ohlcv.csv
+    python -m src.lib.bulk_import data/news/cryptopanic_news.csv.gz \\
+        data/news/news__currency.csv --currency-file data/newscurrency.csv
+
+Supported files (plain CSV or compressed: .gz, .bz2, .zip, .xz, .zst):
+
+- ``ohlcv``: ``timestamp, open, high, low, close, volume`` and optionally ``symbol``,
+  otherwise the symbol is taken from the file name (``BTC_USDT_USDT_1h_ohlcv.csv``).
+- ``news``: CryptoPanic dumps with ``id, title, url``, the vote columns and
+  ``published_at`` or ``newsDatetime``.
+- ``news_currency``: ``newsId, currencyId`` (resolved with ``--currency-file``) or
+  ``news_id, currency``.
+
+Files are streamed in chunks with typed readers (memory-mapped when uncompressed), so memory
+is bounded by ``--chunksize`` rows per worker. Each file is imported by its own process. A chunk
+is copied with ``COPY`` into a temporary table and merged with ``INSERT ... ON CONFLICT DO
+NOTHING`` in the same transaction as its checkpoint in ``bulk_import_progress``. An interrupted
+import resumes after the last committed chunk.
+"""
+
+import argparse
+import io
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, Engine, create_engine, text
+
+from config.database import ENGINE
+from src.lib.crypto_news import NEWS_COLUMNS
+from src.lib.news_sentiment import refresh_sentiment_bars
+from src.utils.loggerring import logger
+from src.utils.metrics import track_stage
+from src.utils.partitions import ensure_partitions, month_start
+from src.utils.sql_operators import notify_write, select
+
+DEFAULT_CHUNKSIZE = 200_000
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+PROGRESS_TABLE = "bulk_import_progress"
+
+# Serialises partition creation between import workers
+PARTITIONS_LOCK_KEY = 20250327
+
+VOTE_COLUMNS = NEWS_COLUMNS[4:]
+
+# Target table, inserted columns and conflict key per kind of file
+TARGETS = {
+    "ohlcv": ("futures_ohlcv", ["symbol", "timestamp", "open", "high", "low", "close", "volume"]),
+    "news": ("crypto_news", NEWS_COLUMNS + ["cluster_id"]),
+    "news_currency": ("crypto_news_currency", ["news_id", "currency"]),
+}
+
+# Columns read per kind and their types, all other columns of a file are skipped
+READ_DTYPES = {
+    "ohlcv": {
+        "symbol": "string",
+        "timestamp": "string",
+        **{column: "float64" for column in ["open", "high", "low", "close", "volume"]},
+    },
+    "news": {
+        "id": "int64",
+        "title": "string",
+        "url": "string",
+        "published_at": "string",
+        "newsDatetime": "string",
+        **{column: "float64" for column in VOTE_COLUMNS},
+    },
+    "news_currency": {
+        "newsId": "int64",
+        "currencyId": "int64",
+        "news_id": "int64",
+        "currency": "string",
+    },
+}
+
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".zip", ".xz", ".zst", ".tar")
+
+_SYMBOL_FILE = re.compile(
+    r"^(?P<base>[A-Za-z0-9]+)_(?P<quote>[A-Za-z0-9]+)[_:](?P<settle>[A-Za-z0-9]+)_"
+)
+
+# A time of day followed by "Z" or a UTC offset such as "+02:00", "+0200" or "-05"
+_UTC_OFFSET = r"\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:[Zz]|[+-]\d{2}(?::?\d{2})?)$"
+
+
+def detect_kind(path: str) -> str:
+    """
+    Tell the kind of a file from its header.
+
+    Raises
+    ------
+    ValueError
+        If the columns match no supported kind.
+    """
+    columns = set(pd.read_csv(path, nrows=0).columns)
+    if {"timestamp", "open", "high", "low", "close", "volume"} <= columns:
+        return "ohlcv"
+    if {"id", "title", "url"} <= columns and columns & {"published_at", "newsDatetime"}:
+        return "news"
+    if {"newsId", "currencyId"} <= columns or {"news_id", "currency"} <= columns:
+        return "news_currency"
+    raise ValueError(f"Unknown file layout of {path}: {sorted(columns)}")
+
+
+def symbol_from_filename(path: str) -> Optional[str]:
+    """
+    Symbol encoded in a file name as written by ``save_ohlcv_to_csv``.
+
+    'BTC_USDT_USDT_1h_ohlcv.csv' and 'BTC_USDT:USDT_1h_ohlcv.csv' give 'BTC/USDT:USDT'.
+    """
+    match = _SYMBOL_FILE.match(os.path.basename(path))
+    if match is None:
+        return None
+    return f"{match['base']}/{match['quote']}:{match['settle']}".upper()
+
+
+def normalize_timestamps(values: pd.Series) -> pd.Series:
+    """
+    Convert timestamps to naive UTC datetimes.
+
+    Accepts Unix seconds or milliseconds and ISO 8601 strings with or without an offset,
+    strings without an offset are taken as UTC. Missing or unparsable values become NaT.
+    """
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric[values.notna()].notna().all():
+        unit = "ms" if numeric.abs().max() > 1e11 else "s"
+        return pd.to_datetime(numeric, unit=unit)
+
+    # Parsed together, pandas would apply the first offset of the chunk to the naive strings
+    strings = values.astype("string").str.strip()
+    has_offset = strings.str.contains(_UTC_OFFSET, regex=True, na=False)
+    timestamps = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    if has_offset.any():
+        timestamps[has_offset] = pd.to_datetime(
+            strings[has_offset], utc=True, format="ISO8601", errors="coerce"
+        ).dt.tz_localize(None)
+    if not has_offset.all():
+        timestamps[~has_offset] = pd.to_datetime(
+            strings[~has_offset], format="ISO8601", errors="coerce"
+        )
+    return timestamps
+
+
+def drop_missing_timestamps(chunk: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Drop the rows whose ``column`` is NaT, they would fail the whole chunk's COPY.
+    """
+    missing = chunk[column].isna()
+    if missing.any():
+        logger.warning(f"Dropped {missing.sum()} rows without a valid {column}.")
+        chunk = chunk[~missing].copy()
+    return chunk
+
+
+def read_chunks(path: str, kind: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a file in typed chunks of at most ``chunksize`` rows.
+    """
+    dtypes = READ_DTYPES[kind]
+    compressed = path.lower().endswith(COMPRESSED_EXTENSIONS)
+    yield from pd.read_csv(
+        path,
+        chunksize=chunksize,
+        usecols=lambda column: column in dtypes,
+        dtype=dtypes,
+        memory_map=not compressed,
+        compression="infer",
+        engine="c",
+    )
+
+
+def prepare_ohlcv(chunk: pd.DataFrame, symbol: Optional[str]) -> pd.DataFrame:
+    if "symbol" not in chunk.columns or chunk["symbol"].isna().any():
+        if symbol is None:
+            raise ValueError("The file has no symbol column, pass --symbol")
+        chunk["symbol"] = chunk.get("symbol", pd.Series(index=chunk.index, dtype="string"))
+        chunk["symbol"] = chunk["symbol"].fillna(symbol)
+    chunk["timestamp"] = normalize_timestamps(chunk["timestamp"])
+    return drop_missing_timestamps(chunk, "timestamp")
+
+
+def prepare_news(chunk: pd.DataFrame) -> pd.DataFrame:
+    published = chunk["published_at"] if "published_at" in chunk else chunk["newsDatetime"]
+    chunk["published_at"] = normalize_timestamps(published)
+    chunk = drop_missing_timestamps(chunk, "published_at")
+    chunk["published_at"] = chunk["published_at"].astype("int64") // 10**9
+    for column in VOTE_COLUMNS:
+        values = chunk[column] if column in chunk else pd.Series(0, index=chunk.index)
+        chunk[column] = values.fillna(0).astype("int64")
+    # Imported news start as their own clusters, see src/lib/news_dedup.py recluster_news
+    chunk["cluster_id"] = chunk["id"]
+    return chunk
+
+
+def prepare_news_currency(
+    chunk: pd.DataFrame, currency_codes: Optional[Dict[int, str]]
+) -> pd.DataFrame:
+    if "news_id" in chunk.columns:
+        return chunk
+    if currency_codes is None:
+        raise ValueError("newsId/currencyId files need --currency-file with id and code columns")
+    chunk["news_id"] = chunk["newsId"]
+    chunk["currency"] = chunk["currencyId"].map(currency_codes)
+    return chunk.dropna(subset=["currency"])
+
+
+def load_currency_codes(path: Optional[str]) -> Optional[Dict[int, str]]:
+    """
+    Map currency ids to codes from a CryptoPanic ``currency`` dump (``id, code, ...``).
+    """
+    if path is None:
+        return None
+    currencies = pd.read_csv(path, usecols=["id", "code"], dtype={"id": "int64", "code": "string"})
+    return dict(zip(currencies["id"], currencies["code"]))
+
+
+def copy_chunk(connection: Connection, data: pd.DataFrame, table: str, columns: List[str]) -> int:
+    """
+    Insert a chunk with COPY through a temporary table, skipping existing keys.
+
+    Returns
+    -------
+    int
+        Number of inserted rows.
+    """
+    staging = f"{table}_import"
+    column_list = ", ".join(columns)
+    connection.execute(
+        text(f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+    )
+
+    buffer = io.StringIO()
+    data[columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    result = connection.execute(
+        text(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+            "ON CONFLICT DO NOTHING"
+        )
+    )
+    return result.rowcount
+
+
+def _checkpoint(connection: Connection, path: str, rows_done: int, inserted: int) -> None:
+    connection.execute(
+        text(
+            f"UPDATE {PROGRESS_TABLE} SET rows_done = :rows_done, "
+            "rows_inserted = rows_inserted + :inserted, updated_at = CURRENT_TIMESTAMP "
+            "WHERE path = :path"
+        ),
+        {"path": path, "rows_done": rows_done, "inserted": inserted},
+    )
+
+
+def _start_progress(engine: Engine, path: str, kind: str, restart: bool) -> Optional[int]:
+    """
+    Register a file and return the rows already imported, or None if it is complete.
+    """
+    stat = os.stat(path)
+    size, mtime = stat.st_size, int(stat.st_mtime)
+    progress = select(
+        f"SELECT file_size, file_mtime, rows_done, finished_at FROM {PROGRESS_TABLE} "
+        "WHERE path = :path",
+        params={"path": path},
+        engine=engine,
+    )
+
+    unchanged = (
+        not progress.empty
+        and int(progress["file_size"].iloc[0]) == size
+        and int(progress["file_mtime"].iloc[0]) == mtime
+    )
+    if unchanged and not restart:
+        if pd.notna(progress["finished_at"].iloc[0]):
+            return None
+        return int(progress["rows_done"].iloc[0])
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                f"INSERT INTO {PROGRESS_TABLE} (path, kind, file_size, file_mtime) "
+                "VALUES (:path, :kind, :size, :mtime) "
+                "ON CONFLICT (path) DO UPDATE SET kind = EXCLUDED.kind, "
+                "file_size = EXCLUDED.file_size, file_mtime = EXCLUDED.file_mtime, rows_done = 0, "
+                "rows_inserted = 0, started_at = CURRENT_TIMESTAMP, "
+                "updated_at = CURRENT_TIMESTAMP, finished_at = NULL"
+            ),
+            {"path": path, "kind": kind, "size": size, "mtime": mtime},
+        )
+    return 0
+
+
+def _ensure_partitions_from(engine: Engine, first_month: datetime) -> None:
+    with engine.connect() as lock_connection:
+        lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PARTITIONS_LOCK_KEY})
+        try:
+            ensure_partitions(start=first_month, engine=engine)
+        finally:
+            lock_connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": PARTITIONS_LOCK_KEY}
+            )
+            lock_connection.commit()
+
+
+def import_file(
+    path: str,
+    kind: Optional[str] = None,
+    symbol: Optional[str] = None,
+    currency_file: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    restart: bool = False,
+    database_url: Optional[str] = None,
+) -> dict:
+    """
+    Import one file, resuming after its last committed chunk.
+
+    Parameters
+    ----------
+    path : str
+        CSV file, optionally compressed.
+    kind : str, optional
+        "ohlcv", "news" or "news_currency". Default is detected from the header.
+    symbol : str, optional
+        Symbol of an OHLCV file without a symbol column. Default is taken from the file name.
+    currency_file : str, optional
+        Currency dump resolving ``currencyId`` of a ``news__currency`` file.
+    chunksize : int, optional
+        Rows read, copied and committed at a time. Default is 200 000.
+    restart : bool, optional
+        Import the file from the start even if it was (partly) imported before.
+    database_url : str, optional
+        Database to import into. Default is the main engine.
+
+    Returns
+    -------
+    dict
+        ``path``, ``kind``, ``rows`` (read in this run), ``inserted``, ``seconds`` and
+        ``first``/``last`` timestamp of the imported rows (Unix seconds for news).
+    """
+    path = os.path.abspath(path)
+    engine = create_engine(database_url) if database_url else ENGINE
+    kind = kind or detect_kind(path)
+    table, columns = TARGETS[kind]
+    symbol = symbol or symbol_from_filename(path)
+    currency_codes = load_currency_codes(currency_file) if kind == "news_currency" else None
+
+    summary = {"path": path, "kind": kind, "rows": 0, "inserted": 0, "first": None, "last": None}
+    summary["skipped"] = False
+    started = time.perf_counter()
+    rows_done = _start_progress(engine, path, kind, restart)
+    if rows_done is None:
+        logger.info(f"{path} was already imported, skipping.")
+        return {**summary, "seconds": 0.0, "skipped": True}
+
+    position = 0
+    covered_from: Optional[datetime] = None
+    for chunk in read_chunks(path, kind, chunksize):
+        chunk_end = position + len(chunk)
+        if chunk_end <= rows_done:
+            position = chunk_end
+            continue
+        chunk = chunk.iloc[max(0, rows_done - position) :]
+        position = chunk_end
+
+        with track_stage("bulk_import", symbol=symbol, table=table) as stage:
+            if kind == "ohlcv":
+                chunk = prepare_ohlcv(chunk, symbol)
+                first = month_start(chunk["timestamp"].min()) if not chunk.empty else None
+                if first is not None and (covered_from is None or first < covered_from):
+                    _ensure_partitions_from(engine, first)
+                    covered_from = first
+                bounds = chunk["timestamp"]
+            elif kind == "news":
+                chunk = prepare_news(chunk)
+                bounds = chunk["published_at"]
+            else:
+                chunk = prepare_news_currency(chunk, currency_codes)
+                bounds = None
+
+            with engine.begin() as connection:
+                inserted = copy_chunk(connection, chunk, table, columns)
+                _checkpoint(connection, path, position, inserted)
+            if inserted:
+                notify_write(table, chunk[["symbol"]] if kind == "ohlcv" else None)
+            stage.add_rows(len(chunk))
+
+        summary["rows"] += len(chunk)
+        summary["inserted"] += inserted
+        if bounds is not None and not bounds.empty:
+            first, last = bounds.min(), bounds.max()
+            summary["first"] = first if summary["first"] is None else min(summary["first"], first)
+            summary["last"] = last if summary["last"] is None else max(summary["last"], last)
+        logger.info(f"{os.path.basename(path)}: {position} rows read, {summary['inserted']} new.")
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(f"UPDATE {PROGRESS_TABLE} SET finished_at = CURRENT_TIMESTAMP WHERE path = :path"),
+            {"path": path},
+        )
+
+    summary["seconds"] = time.perf_counter() - started
+    logger.info(
+        f"Imported {summary['rows']} rows ({summary['inserted']} new) of {path} into {table} "
+        f"in {summary['seconds']:.1f}s."
+    )
+    return summary
+
+
+def refresh_imported_sentiment(engine: Engine = ENGINE) -> List[str]:
+    """
+    Recompute the sentiment bars of every currency over its linked news.
+
+    Returns
+    -------
+    List[str]
+        Refreshed currencies.
+    """
+    ranges = select(
+        "SELECT link.currency, MIN(news.published_at) AS first, MAX(news.published_at) AS last "
+        "FROM crypto_news_currency AS link JOIN crypto_news AS news ON news.id = link.news_id "
+        "GROUP BY link.currency",
+        engine=engine,
+    )
+    for row in ranges.itertuples(index=False):
+        refresh_sentiment_bars(row.currency, int(row.first), int(row.last) + 1, engine=engine)
+    return ranges["currency"].tolist()
+
+
+def import_files(
+    paths: List[str],
+    workers: int = DEFAULT_WORKERS,
+    engine: Engine = ENGINE,
+    **options,
+) -> pd.DataFrame:
+    """
+    Import files in parallel, one process per file, then refresh the derived tables.
+
+    Parameters
+    ----------
+    paths : List[str]
+        Files to import.
+    workers : int, optional
+        Files imported at the same time. Default is up to 4.
+    engine : sqlalchemy.engine.Engine, optional
+        Database to import into. Default is the main engine.
+    **options
+        Passed to ``import_file``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One summary row per file, see ``import_file``.
+    """
+    # Engines are not shared across processes, every worker connects on its own
+    options["database_url"] = engine.url.render_as_string(hide_password=False)
+
+    if workers <= 1 or len(paths) == 1:
+        summaries = [import_file(path, **options) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+            futures = [executor.submit(import_file, path, **options) for path in paths]
+            summaries = [future.result() for future in futures]
+
+    summaries = pd.DataFrame(summaries)
+    imported = summaries[summaries["inserted"] > 0]
+    if imported["kind"].isin(["news", "news_currency"]).any():
+        currencies = refresh_imported_sentiment(engine)
+        logger.info(f"Refreshed sentiment bars of {', '.join(currencies) or 'no currencies'}.")
+    return summaries
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].split(": ")[-1])
+    parser.add_argument("paths", nargs="+", help="CSV files, optionally compressed")
+    parser.add_argument("--kind", choices=sorted(TARGETS), help="Default: from the header")
+    parser.add_argument("--symbol", help="Symbol of OHLCV files without a symbol column")
+    parser.add_argument("--currency-file", help="Currency dump with id and code columns")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--restart", action="store_true", help="Ignore previous progress")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    summaries = import_files(
+        args.paths,
+        workers=args.workers,
+        kind=args.kind,
+        symbol=args.symbol,
+        currency_file=args.currency_file,
+        chunksize=args.chunksize,
+        restart=args.restart,
+    )
+    rows_per_sec = summaries["rows"] / summaries["seconds"].replace(0, np.nan)
+    print(summaries.assign(rows_per_sec=rows_per_sec.round(0)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Module: candle_gaps.py
+Description: Detection and targeted repair of missing hours in the futures_ohlcv history.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import Engine
+
+from config.database import ENGINE
+from src.lib.futures_data import fetch_ohlcv_window
+from src.utils.loggerring import logger
+from src.utils.query_registry import QUERIES
+from src.utils.sql_operators import upload_without_duplicates
+
+HOUR = timedelta(hours=1)
+
+# Candles returned by one exchange request, see fetch_ohlcv_window
+PAGE_LIMIT = 1000
+
+
+def last_closed_hour() -> datetime:
+    """
+    Return the start of the last fully closed hour as a naive UTC datetime.
+    """
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    return now - HOUR
+
+
+def _resolve_range(
+    symbol: str, start: Optional[datetime], end: Optional[datetime], engine: Engine
+) -> Optional[Tuple[datetime, datetime]]:
+    if start is None:
+        bounds = QUERIES.select("futures_bounds", engine=engine, symbol=symbol)
+        first_timestamp = bounds["first_timestamp"].iloc[0]
+        if pd.isna(first_timestamp):
+            return None
+        start = pd.Timestamp(first_timestamp).to_pydatetime()
+    end = end or last_closed_hour()
+    if start > end:
+        return None
+    return start, end
+
+
+def find_gaps(
+    symbol: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    engine: Engine = ENGINE,
+) -> pd.DataFrame:
+    """
+    Find missing hours of a symbol against the expected hourly grid.
+
+    Parameters
+    ----------
+    symbol : str
+        The trading symbol (e.g., 'BTC/USDT:USDT').
+    start : datetime, optional
+        First hour of the grid. Default is the first stored candle of the symbol.
+    end : datetime, optional
+        Last hour of the grid (inclusive). Default is the last closed hour.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per gap with ``gap_start``, ``gap_end`` (both inclusive) and
+        ``missing_hours``. Empty if the grid is complete or the symbol has no data.
+
+    Notes
+    -----
+    The gaps are computed in SQL from consecutive stored candles, so only the
+    gap boundaries are returned instead of every expected hour.
+    """
+    columns = ["gap_start", "gap_end", "missing_hours"]
+    date_range = _resolve_range(symbol, start, end, engine)
+    if date_range is None:
+        return pd.DataFrame(columns=columns)
+
+    start, end = date_range
+    return QUERIES.select("futures_gaps", engine=engine, symbol=symbol, start=start, end=end)
+
+
+def merge_gaps(gaps: pd.DataFrame, page_limit: int = PAGE_LIMIT) -> List[Tuple[datetime, datetime]]:
+    """
+    Merge gaps into the fewest fetch windows.
+
+    Neighbouring gaps are fetched together while the merged window fits into one
+    exchange page, since re-fetching the candles between them costs no extra request.
+    Gaps longer than a page stay on their own and are fetched page by page.
+
+    Parameters
+    ----------
+    gaps : pd.DataFrame
+        Output of ``find_gaps``.
+    page_limit : int, optional
+        Candles per exchange request. Default is 1000.
+
+    Returns
+    -------
+    List[Tuple[datetime, datetime]]
+        Inclusive ``(start, end)`` windows, ordered by time.
+    """
+    windows: List[Tuple[datetime, datetime]] = []
+    max_span = (page_limit - 1) * HOUR
+
+    for gap in gaps.sort_values("gap_start").itertuples():
+        gap_start = pd.Timestamp(gap.gap_start).to_pydatetime()
+        gap_end = pd.Timestamp(gap.gap_end).to_pydatetime()
+
+        if windows and gap_end - windows[-1][0] <= max_span:
+            windows[-1] = (windows[-1][0], gap_end)
+        else:
+            windows.append((gap_start, gap_end))
+
+    return windows
+
+
+def _window_hours(windows: List[Tuple[datetime, datetime]]) -> int:
+    return sum(int((end - start) / HOUR) + 1 for start, end in windows)
+
+
+def gap_coverage(
+    symbol: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    engine: Engine = ENGINE,
+) -> dict:
+    """
+    Report how much of the expected hourly grid of a symbol is stored.
+
+    Returns
+    -------
+    dict
+        ``symbol``, ``start``, ``end``, ``expected_hours``, ``missing_hours``,
+        ``gaps`` and ``coverage`` (share of expected hours present, 0 to 1). Without
+        stored candles ``coverage`` is 0.0 and ``start``/``end`` are the requested bounds.
+    """
+    date_range = _resolve_range(symbol, start, end, engine)
+    if date_range is None:
+        return _no_coverage(symbol, start, end)
+
+    start, end = date_range
+    return _coverage(symbol, start, end, find_gaps(symbol, start, end, engine=engine))
+
+
+def _no_coverage(symbol: str, start: Optional[datetime], end: Optional[datetime]) -> dict:
+    # No candles to start the grid from, or an empty range: same keys as ``_coverage``
+    return {
+        "symbol": symbol,
+        "start": start,
+        "end": end or last_closed_hour(),
+        "expected_hours": 0,
+        "missing_hours": 0,
+        "gaps": 0,
+        "coverage": 0.0,
+    }
+
+
+def _coverage(symbol: str, start: datetime, end: datetime, gaps: pd.DataFrame) -> dict:
+    expected_hours = int((end - start) / HOUR) + 1
+    missing_hours = int(gaps["missing_hours"].sum()) if not gaps.empty else 0
+    return {
+        "symbol": symbol,
+        "start": start,
+        "end": end,
+        "expected_hours": expected_hours,
+        "missing_hours": missing_hours,
+        "gaps": len(gaps),
+        "coverage": 1 - missing_hours / expected_hours,
+    }
+
+
+def repair_gaps(
+    symbol: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    exchange=None,
+    engine: Engine = ENGINE,
+) -> dict:
+    """
+    Fetch only the missing hours of a symbol and store them.
+
+    Parameters
+    ----------
+    symbol : str
+        The trading symbol (e.g., 'BTC/USDT:USDT').
+    start : datetime, optional
+        First hour to check. Default is the first stored candle of the symbol.
+    end : datetime, optional
+        Last hour to check (inclusive). Default is the last closed hour.
+    exchange : ccxt.Exchange, optional
+        Exchange client to fetch from. Default is a new rate-limited BingX client.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    dict
+        Gap coverage report, see ``gap_coverage``, extended with ``windows``,
+        ``fetched_hours``, ``repaired_hours`` and the coverage after the repair.
+    """
+    date_range = _resolve_range(symbol, start, end, engine)
+    if date_range is None:
+        logger.warning(f"No candles stored for {symbol}, nothing to repair.")
+        return {
+            **_no_coverage(symbol, start, end),
+            "windows": 0,
+            "fetched_hours": 0,
+            "repaired_hours": 0,
+            "missing_hours_after": 0,
+            "coverage_after": 0.0,
+        }
+
+    start, end = date_range
+    gaps = find_gaps(symbol, start, end, engine=engine)
+    before = _coverage(symbol, start, end, gaps)
+    windows = merge_gaps(gaps)
+
+    for window_start, window_end in windows:
+        ohlcv_data = fetch_ohlcv_window(
+            symbol,
+            int(window_start.replace(tzinfo=timezone.utc).timestamp() * 1000),
+            int(window_end.replace(tzinfo=timezone.utc).timestamp() * 1000),
+            exchange=exchange,
+        )
+        if ohlcv_data.empty:
+            continue
+        ohlcv_data["timestamp"] = pd.to_datetime(ohlcv_data["timestamp"], unit="ms")
+        ohlcv_data["symbol"] = symbol
+        upload_without_duplicates(ohlcv_data, table_name="futures_ohlcv", engine=engine)
+
+    after = gap_coverage(symbol, start, end, engine=engine)
+    report = {
+        **before,
+        "windows": len(windows),
+        "fetched_hours": _window_hours(windows),
+        "repaired_hours": before["missing_hours"] - after["missing_hours"],
+        "missing_hours_after": after["missing_hours"],
+        "coverage_after": after["coverage"],
+    }
+    logger.info(
+        f"Repaired {report['repaired_hours']} of {before['missing_hours']} missing hours "
+        f"for {symbol} with {len(windows)} fetch windows."
+    )
+    return report
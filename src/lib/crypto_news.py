@@ -4,10 +4,33 @@ import pandas as pd
 import requests
 
 from config.variables import CRYPTO_PANIC_BASE_URL
-from src.utils.sql_operators import get_query_from_sql_file, select, upload_without_duplicates
-
-
-def get_latest_crypto_news(currency: Literal["BTC", "ETH", "SOL"], page_number: int = 1) -> dict:
+from src.lib.news_dedup import NEWS_DEDUP
+from src.lib.news_sentiment import update_sentiment_bars
+from src.utils.loggerring import logger
+from src.utils.metrics import track_stage
+from src.utils.query_registry import QUERIES
+from src.utils.sql_operators import upload_without_duplicates
+
+NEWS_COLUMNS = [
+    "id",
+    "title",
+    "published_at",
+    "url",
+    "negative",
+    "positive",
+    "important",
+    "liked",
+    "disliked",
+    "lol",
+    "toxic",
+    "saved",
+    "comments",
+]
+
+
+def get_latest_crypto_news(
+    currency: Literal["BTC", "ETH", "SOL"], page_number: int = 1, session=None
+) -> dict:
     """
     Fetch the latest crypto news from CryptoPanic.
     Default currencies are BTC, ETH, and SOL.
@@ -20,16 +43,22 @@ def get_latest_crypto_news(currency: Literal["BTC", "ETH", "SOL"], page_number:
     currency : Literal['BTC', 'ETH', 'SOL']
         Currency to fetch (default is 'BTC').
 
+    session : requests.Session, optional
+        Object with a ``get`` method used for the request. Default is the ``requests`` module.
+
     Returns
     -------
     dict
         The latest news.
     """
     fetch_url = f"{CRYPTO_PANIC_BASE_URL}&currencies={currency}&page={page_number}"
-    response = requests.get(fetch_url)
-    response.raise_for_status()
+    with track_stage("news_fetch", symbol=currency) as stage:
+        response = (session or requests).get(fetch_url)
+        response.raise_for_status()
+        news_data = response.json()
+        stage.add_rows(len(news_data.get("results", [])))
 
-    return response.json()
+    return news_data
 
 
 def process_news(news_data: dict) -> pd.DataFrame:
@@ -69,11 +98,11 @@ def process_news(news_data: dict) -> pd.DataFrame:
         }
         data.append(row)
 
-        df = pd.DataFrame(data)
+    df = pd.DataFrame(data, columns=NEWS_COLUMNS)
 
-        # Convert published_at to datetime and then to Unix timestamp
-        df["published_at"] = pd.to_datetime(df["published_at"])
-        df["published_at"] = df["published_at"].astype("int64") // 10**9
+    # Convert published_at to datetime and then to Unix timestamp
+    df["published_at"] = pd.to_datetime(df["published_at"])
+    df["published_at"] = df["published_at"].astype("int64") // 10**9
 
     return df
 
@@ -82,19 +111,30 @@ def update_news(currency: Literal["BTC", "ETH", "SOL"]):
     """
     Update the news data in the database for a specific currency.
 
+    Near-duplicate titles are assigned the ``cluster_id`` of the first item of
+    their story, see ``src.lib.news_dedup``. The hourly sentiment bars of the
+    currency are recomputed for the hours of the fetched news.
+
     Parameters
     ----------
     currency : Literal['BTC', 'ETH', 'SOL']
         The currency to update the news for.
     """
     news_data = get_latest_crypto_news(currency)
-    news_df = process_news(news_data)
+    with track_stage("news_parse", symbol=currency) as stage:
+        news_df = process_news(news_data)
+        stage.add_rows(len(news_df))
+    with track_stage("news_dedup", symbol=currency) as stage:
+        news_df["cluster_id"] = NEWS_DEDUP.assign(news_df)
+        stage.add_rows(len(news_df))
+    clusters = news_df["cluster_id"].nunique()
+    logger.info(f"{len(news_df)} {currency} news items fall into {clusters} clusters.")
     upload_without_duplicates(news_df, table_name="crypto_news")
+    update_sentiment_bars(news_df, currency)
 
 
 def latest_news() -> pd.DataFrame:
     """
     Get the latest news from the database.
     """
-    query = get_query_from_sql_file("queries/latest_news.sql")
-    return select(query)
+    return QUERIES.select("latest_news")
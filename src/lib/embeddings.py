@@ -0,0 +1,122 @@
+"""
+Module: embeddings.py
+Description: Sentence embeddings of news titles.
+
+Titles are embedded with the ``sentence-transformers`` model used in the research notebook
+(``all-MiniLM-L6-v2`` by default). When the optional package is not installed, a hashing
+embedder of word and character n-grams is used instead, so that similarity search keeps
+working (lexically) on machines without torch.
+"""
+
+import re
+import threading
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+from config.variables import EMBEDDING_MODEL
+from src.utils.metrics import track_stage
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # pragma: no cover - embeddings fall back to hashing
+    SentenceTransformer = None
+
+HASHING_DIMENSIONS = 384
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of word unigrams, bigrams and character 4-grams.
+
+    Parameters
+    ----------
+    dimensions : int, optional
+        Size of the embeddings. Default is 384, as for MiniLM.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def _features(self, title: str) -> List[str]:
+        words = _TOKEN.findall(title.lower())
+        joined = " ".join(words)
+        return (
+            words
+            + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            + [f"#{joined[i : i + 4]}" for i in range(max(0, len(joined) - 3))]
+        )
+
+    def encode(self, titles: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(titles), self.dimensions), dtype=np.float32)
+        for row, title in enumerate(titles):
+            for feature in self._features(str(title)):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dimensions] += sign
+        return vectors
+
+
+class SentenceEmbedder:
+    """
+    ``sentence-transformers`` model, loaded on first use.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = SentenceTransformer(self.name, device="cpu")
+            return self._model
+
+    @property
+    def dimensions(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, titles: List[str]) -> np.ndarray:
+        return self.model.encode(titles, batch_size=64, convert_to_numpy=True).astype(np.float32)
+
+
+def default_embedder():
+    """
+    Return the sentence-transformers embedder if installed, the hashing embedder otherwise.
+    """
+    if SentenceTransformer is None:
+        return HashingEmbedder()
+    return SentenceEmbedder()
+
+
+EMBEDDER = default_embedder()
+
+
+def embed_titles(titles: Iterable[str], embedder=None) -> np.ndarray:
+    """
+    Embed titles into unit-length float32 vectors, so that dot products are cosine similarities.
+
+    Parameters
+    ----------
+    titles : Iterable[str]
+        Titles to embed.
+    embedder : optional
+        Object with an ``encode(list) -> np.ndarray`` method. Default is ``EMBEDDER``.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape ``(len(titles), dimensions)``.
+    """
+    titles = list(titles)
+    with track_stage("inference", table="embeddings") as stage:
+        vectors = (embedder or EMBEDDER).encode(titles)
+        stage.add_rows(len(titles))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -5,15 +5,12 @@ import ccxt
 import pandas as pd
 
 from src.utils.loggerring import logger
-from src.utils.sql_operators import (
-    format_sql,
-    get_query_from_sql_file,
-    select,
-    upload_without_duplicates,
-)
+from src.utils.metrics import track_stage
+from src.utils.query_registry import QUERIES
+from src.utils.sql_operators import upload_without_duplicates
 
 
-def bingx_futures_date_range_1h(start_date, end_date, symbol):
+def bingx_futures_date_range_1h(start_date, end_date, symbol, exchange=None):
     """
     Fetch historical OHLCV data for futures on BingX within a specified date range.
 
@@ -25,17 +22,20 @@ def bingx_futures_date_range_1h(start_date, end_date, symbol):
         The end date in 'YYYY-MM-DD' format.
     symbol : str
         The trading symbol (e.g., 'BTC/USDT:USDT').
+    exchange : ccxt.Exchange, optional
+        Exchange client to fetch from. Default is a new rate-limited BingX client.
 
     Returns
     -------
     pd.DataFrame
     """
 
-    exchange = ccxt.bingx(
-        {
-            "enableRateLimit": True,
-        }
-    )
+    if exchange is None:
+        exchange = ccxt.bingx(
+            {
+                "enableRateLimit": True,
+            }
+        )
 
     start_timestamp = exchange.parse8601(start_date + "T00:00:00Z")
     today = datetime.now().strftime("%Y-%m-%d")
@@ -47,12 +47,47 @@ def bingx_futures_date_range_1h(start_date, end_date, symbol):
     else:
         end_timestamp = exchange.parse8601(end_date + "T23:59:59Z")
 
+    return fetch_ohlcv_window(symbol, start_timestamp, end_timestamp, exchange=exchange)
+
+
+def fetch_ohlcv_window(symbol, start_timestamp, end_timestamp, exchange=None):
+    """
+    Fetch hourly OHLCV candles between two timestamps, page by page.
+
+    Parameters
+    ----------
+    symbol : str
+        The trading symbol (e.g., 'BTC/USDT:USDT').
+    start_timestamp : int
+        First candle to fetch, in milliseconds since the epoch.
+    end_timestamp : int
+        Last candle to fetch (inclusive), in milliseconds since the epoch.
+    exchange : ccxt.Exchange, optional
+        Exchange client to fetch from. Default is a new rate-limited BingX client.
+
+    Returns
+    -------
+    pd.DataFrame
+        Candles with the timestamp in milliseconds. Empty if any page fails.
+    """
+    if exchange is None:
+        exchange = ccxt.bingx(
+            {
+                "enableRateLimit": True,
+            }
+        )
+
+    start_date = pd.to_datetime(start_timestamp, unit="ms")
+    end_date = pd.to_datetime(end_timestamp, unit="ms")
+
     all_ohlcv = pd.DataFrame()
 
     current_timestamp = start_timestamp
-    while current_timestamp < end_timestamp:
+    while current_timestamp <= end_timestamp:
         try:
-            ohlcv = exchange.fetch_ohlcv(symbol, "1h", since=current_timestamp, limit=1000)
+            with track_stage("exchange_fetch", symbol=symbol) as stage:
+                ohlcv = exchange.fetch_ohlcv(symbol, "1h", since=current_timestamp, limit=1000)
+                stage.add_rows(len(ohlcv or []))
             if not ohlcv or len(ohlcv) == 0:
                 logger.warning(f"No data returned for {symbol} from {start_date} to {end_date}")
                 return pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume"])
@@ -97,7 +132,9 @@ def get_bingx_futures_ohlcv(symbol, timeframe, limit=100) -> pd.DataFrame:
         }
     )
 
-    ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+    with track_stage("exchange_fetch", symbol=symbol) as stage:
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        stage.add_rows(len(ohlcv))
 
     df = pd.DataFrame(ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
 
@@ -171,9 +208,7 @@ def get_latest_futures_data(symbol):
     -------
     pd.DataFrame
     """
-    query = get_query_from_sql_file("queries/latest_futures_data.sql")
-    query = format_sql(query, params={"symbol": symbol})
-    data = select(query)
+    data = QUERIES.select("latest_futures_data", symbol=symbol)
     return data
 
 
@@ -0,0 +1,392 @@
+"""
+Module: news_dedup.py
+Description: Near-duplicate detection of news titles with MinHash signatures and an LSH index.
+
+CryptoPanic returns the same story from many outlets with slightly reworded titles. Every
+ingested item gets a ``cluster_id``: the id of the first stored item of its story. Embedding
+and prediction only need to run for one representative per cluster, see
+``cluster_representatives``, and their results are joined back on ``cluster_id``.
+
+Titles are normalised and split into character shingles. The MinHash signature of the
+shingle set estimates the Jaccard similarity of two titles, and banding the signature (LSH)
+finds candidate duplicates without comparing against every stored title. The index is kept
+in memory for a sliding window of publication times and is warmed up from the database.
+"""
+
+import argparse
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine, text
+
+from config.database import ENGINE
+from config.variables import NEWS_DEDUP_THRESHOLD, NEWS_DEDUP_WINDOW_HOURS
+from src.utils.loggerring import logger
+from src.utils.query_registry import QUERIES
+from src.utils.sql_operators import notify_write, select
+
+SHINGLE_SIZE = 4
+
+# 32 bands of 4 rows make pairs with a Jaccard similarity of ~0.42 and above candidates,
+# candidates are then checked against the threshold with the full signature
+NUM_PERM = 128
+BANDS = 32
+
+# Mersenne prime 2^61 - 1 and 32-bit coefficients keep (a * x) % p within uint64
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_title(title: str) -> str:
+    """
+    Lowercase a title and strip punctuation and repeated whitespace.
+    """
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", str(title).lower())).strip()
+
+
+def shingle_hashes(title: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    Hash the character shingles of a normalised title to 32-bit integers.
+
+    Titles shorter than ``size`` (e.g. empty ones) have no shingles.
+    """
+    text_ = normalize_title(title)
+    shingles = {text_[i : i + size] for i in range(len(text_) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class NewsDeduplicator:
+    """
+    Incremental MinHash/LSH index assigning cluster ids to news titles.
+
+    Parameters
+    ----------
+    threshold : float, optional
+        Estimated Jaccard similarity of the title shingles from which two items are
+        the same story. Default is ``NEWS_DEDUP_THRESHOLD``.
+    window_hours : float, optional
+        Items are only compared with items published at most this long before them.
+        Default is ``NEWS_DEDUP_WINDOW_HOURS``.
+    num_perm : int, optional
+        MinHash permutations. Default is 128.
+    bands : int, optional
+        LSH bands, must divide ``num_perm``. Default is 32.
+    seed : int, optional
+        Seed of the hash permutations, fixed so that signatures are reproducible.
+    """
+
+    def __init__(
+        self,
+        threshold: float = NEWS_DEDUP_THRESHOLD,
+        window_hours: float = NEWS_DEDUP_WINDOW_HOURS,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+        self.threshold = threshold
+        self.window_seconds = int(window_hours * 3600)
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._clusters: Dict[int, int] = {}
+        self._published: Deque[Tuple[int, int]] = deque()
+        self._newest = 0
+        self._warm = False
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+
+        self.assigned = 0
+        self.duplicates = 0
+
+    def signature(self, title: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature of a title, None if it is too short to have shingles.
+        """
+        hashes = shingle_hashes(title)
+        if not len(hashes):
+            return None
+        permuted = ((self._a[:, None] * hashes[None, :]) % _PRIME + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _match(self, signature: np.ndarray) -> Optional[int]:
+        candidates = {
+            news_id for key in self._band_keys(signature) for news_id in self._buckets.get(key, ())
+        }
+        if not candidates:
+            return None
+
+        candidates = list(candidates)
+        stacked = np.stack([self._signatures[news_id] for news_id in candidates])
+        similarity = (stacked == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return candidates[best] if similarity[best] >= self.threshold else None
+
+    def _index(
+        self, news_id: int, signature: Optional[np.ndarray], published_at: int, cluster_id: int
+    ):
+        if signature is not None:
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, []).append(news_id)
+            self._signatures[news_id] = signature
+        self._clusters[news_id] = cluster_id
+        self._published.append((published_at, news_id))
+        self._newest = max(self._newest, published_at)
+
+    def _evict(self) -> None:
+        # Items arrive roughly in publication order, so the oldest are at the left
+        horizon = self._newest - self.window_seconds
+        while self._published and self._published[0][0] < horizon:
+            _, news_id = self._published.popleft()
+            signature = self._signatures.pop(news_id, None)
+            self._clusters.pop(news_id, None)
+            if signature is None:
+                continue
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.remove(news_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def add(
+        self, news_id: int, title: str, published_at: int, cluster_id: Optional[int] = None
+    ) -> int:
+        """
+        Index one item and return its cluster id.
+
+        Parameters
+        ----------
+        news_id : int
+            Id of the news item.
+        title : str
+            Title of the news item.
+        published_at : int
+            Unix timestamp of the publication.
+        cluster_id : int, optional
+            Known cluster of the item (e.g. loaded from the database). Default is the
+            cluster of its closest indexed duplicate, or a new cluster with its own id.
+            Titles shorter than the shingle size are never matched, all empty titles
+            would otherwise be one story.
+
+        Returns
+        -------
+        int
+            Cluster id of the item.
+        """
+        news_id, published_at = int(news_id), int(published_at)
+        with self._lock:
+            if news_id in self._clusters:
+                return self._clusters[news_id]
+
+            signature = self.signature(title)
+            if cluster_id is None:
+                match = None if signature is None else self._match(signature)
+                cluster_id = news_id if match is None else self._clusters[match]
+                self.assigned += 1
+                self.duplicates += match is not None
+
+            self._index(news_id, signature, published_at, int(cluster_id))
+            self._evict()
+            return int(cluster_id)
+
+    def assign(self, news_df: pd.DataFrame, engine: Engine = ENGINE) -> pd.Series:
+        """
+        Assign cluster ids to a batch of news, indexing the new items.
+
+        Parameters
+        ----------
+        news_df : pd.DataFrame
+            News with ``id``, ``title`` and ``published_at`` columns.
+        engine : sqlalchemy.engine.Engine, optional
+            Database the index is warmed up from on first use. Default is the main engine.
+
+        Returns
+        -------
+        pd.Series
+            Cluster id of every row, aligned with ``news_df``.
+        """
+        self.warm_up(engine)
+        ordered = news_df.sort_values(["published_at", "id"])
+        clusters = [
+            self.add(row.id, row.title, row.published_at)
+            for row in ordered[["id", "title", "published_at"]].itertuples(index=False)
+        ]
+        return pd.Series(clusters, index=ordered.index, name="cluster_id", dtype="int64").reindex(
+            news_df.index
+        )
+
+    def clear(self) -> None:
+        """
+        Drop every indexed item.
+        """
+        with self._lock:
+            self._buckets.clear()
+            self._signatures.clear()
+            self._clusters.clear()
+            self._published.clear()
+            self._newest = 0
+
+    def warm_up(self, engine: Engine = ENGINE, force: bool = False) -> int:
+        """
+        Load the stored news of the window into the index, once per process.
+
+        With ``force`` the index is cleared and reloaded, e.g. after ``recluster_news``
+        changed the stored cluster ids.
+
+        Returns
+        -------
+        int
+            Number of items loaded.
+        """
+        with self._warm_lock:
+            if self._warm and not force:
+                return 0
+            if force:
+                self.clear()
+
+            since = int(time.time()) - self.window_seconds
+            stored = QUERIES.select("news_dedup_window", engine=engine, since=since)
+            for row in stored.itertuples(index=False):
+                cluster_id = None if pd.isna(row.cluster_id) else row.cluster_id
+                self.add(row.id, row.title, row.published_at, cluster_id=cluster_id)
+            self._warm = True
+
+        logger.info(f"Loaded {len(stored)} news items into the near-duplicate index.")
+        return len(stored)
+
+    def stats(self) -> dict:
+        """
+        Size of the index and the share of duplicates among the items assigned so far.
+        """
+        with self._lock:
+            return {
+                "indexed": len(self._signatures),
+                "assigned": self.assigned,
+                "duplicates": self.duplicates,
+                "dedup_ratio": self.duplicates / self.assigned if self.assigned else None,
+            }
+
+
+NEWS_DEDUP = NewsDeduplicator()
+
+
+def cluster_representatives(news_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep one item per cluster, the earliest published one.
+
+    Embedding and scoring run on the representatives only, their results are
+    joined back to every item of the cluster on ``cluster_id``.
+    """
+    return news_df.sort_values(["published_at", "id"]).drop_duplicates("cluster_id")
+
+
+def dedup_ratio(hours: Optional[float] = None, engine: Engine = ENGINE) -> dict:
+    """
+    Report how many stored news items collapse into the same clusters.
+
+    Parameters
+    ----------
+    hours : float, optional
+        Only count news published in the last ``hours``. Default is all news.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    dict
+        ``news``, ``clusters``, ``dedup_ratio`` (share of items that are a duplicate of an
+        earlier one, i.e. inference runs saved) and ``items_per_cluster``.
+    """
+    since = 0 if hours is None else int(time.time() - hours * 3600)
+    counts = QUERIES.select("news_dedup_ratio", engine=engine, since=since).iloc[0]
+    news, clusters = int(counts["news"]), int(counts["clusters"])
+    return {
+        "news": news,
+        "clusters": clusters,
+        "dedup_ratio": 1 - clusters / news if news else None,
+        "items_per_cluster": news / clusters if clusters else None,
+    }
+
+
+def recluster_news(since: int = 0, engine: Engine = ENGINE, batch_size: int = 1000) -> dict:
+    """
+    Recompute the cluster ids of stored news published from ``since`` on.
+
+    Used once after adding the ``cluster_id`` column, when every existing item
+    is its own cluster, or after changing the threshold. The shared ``NEWS_DEDUP``
+    index is reloaded from the new cluster ids.
+
+    Returns
+    -------
+    dict
+        Dedup ratio of the reclustered range, see ``dedup_ratio``.
+    """
+    stored = select(
+        "SELECT id, title, published_at FROM crypto_news "
+        "WHERE published_at >= :since ORDER BY published_at, id",
+        params={"since": since},
+        engine=engine,
+    )
+    index = NewsDeduplicator()
+    stored["cluster_id"] = [
+        index.add(row.id, row.title, row.published_at) for row in stored.itertuples(index=False)
+    ]
+
+    updates = stored[["id", "cluster_id"]].astype("int64").to_dict(orient="records")
+    with engine.begin() as connection:
+        for start in range(0, len(updates), batch_size):
+            connection.execute(
+                text("UPDATE crypto_news SET cluster_id = :cluster_id WHERE id = :id"),
+                updates[start : start + batch_size],
+            )
+    notify_write("crypto_news")
+    # The shared index would keep assigning ingested news to the old clusters
+    NEWS_DEDUP.warm_up(engine, force=True)
+
+    logger.info(f"Reclustered {len(stored)} news items published since {since}.")
+    return {
+        "news": len(stored),
+        "clusters": int(stored["cluster_id"].nunique()),
+        "dedup_ratio": index.stats()["dedup_ratio"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute near-duplicate news clusters.")
+    parser.add_argument("--since-hours", type=float, help="Only news of the last hours")
+    args = parser.parse_args()
+
+    since = 0 if args.since_hours is None else int(time.time() - args.since_hours * 3600)
+    print(recluster_news(since))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Module: news_sentiment.py
+Description: Hourly news-sentiment bars per currency, maintained incrementally on ingest.
+
+``news_sentiment_hourly`` holds the sums of the ``crypto_news`` vote columns per currency and
+UTC hour, aligned with ``futures_ohlcv.timestamp``. Each ingest only recomputes the hours its
+news fall into, and ``candles_with_sentiment`` returns candles and bars already joined.
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+import pandas as pd
+from sqlalchemy import Engine
+
+from config.database import ENGINE
+from src.utils.loggerring import logger
+from src.utils.metrics import track_stage
+from src.utils.query_registry import QUERIES
+from src.utils.sql_operators import execute, get_query_from_sql_file, notify_write
+
+HOUR_SECONDS = 3600
+
+LINK_QUERY = get_query_from_sql_file("queries/maintenance/link_news_currency.sql")
+REFRESH_QUERY = get_query_from_sql_file("queries/maintenance/refresh_news_sentiment_hourly.sql")
+
+
+def symbol_currency(symbol: str) -> str:
+    """
+    Base currency of a trading symbol, e.g. 'BTC' for 'BTC/USDT:USDT'.
+    """
+    return symbol.split("/")[0]
+
+
+def link_news_currency(ids: Iterable[int], currency: str, engine: Engine = ENGINE) -> None:
+    """
+    Record that news items were fetched for a currency.
+    """
+    ids = [int(news_id) for news_id in ids]
+    if ids:
+        execute(LINK_QUERY, params={"ids": ids, "currency": currency}, engine=engine)
+        notify_write("crypto_news_currency")
+
+
+def refresh_sentiment_bars(currency: str, start: int, end: int, engine: Engine = ENGINE) -> None:
+    """
+    Recompute the sentiment bars of a currency for the hours in ``[start, end)``.
+
+    Parameters
+    ----------
+    currency : str
+        Currency of the bars (e.g., 'BTC').
+    start : int
+        Unix timestamp, rounded down to the hour.
+    end : int
+        Unix timestamp (exclusive), rounded up to the hour.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+    """
+    start = start // HOUR_SECONDS * HOUR_SECONDS
+    end = -(-end // HOUR_SECONDS) * HOUR_SECONDS
+    execute(REFRESH_QUERY, params={"currency": currency, "start": start, "end": end}, engine=engine)
+    notify_write("news_sentiment_hourly")
+
+
+def update_sentiment_bars(news_df: pd.DataFrame, currency: str, engine: Engine = ENGINE) -> None:
+    """
+    Link ingested news to a currency and recompute the hours they were published in.
+
+    Parameters
+    ----------
+    news_df : pd.DataFrame
+        Ingested news with ``id`` and ``published_at`` (Unix timestamp) columns.
+    currency : str
+        Currency the news were fetched for.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Notes
+    -----
+    Bars are recomputed from the stored rows rather than incremented, so the update
+    is idempotent and re-fetching a page does not count its news twice.
+    """
+    if news_df.empty:
+        return
+
+    with track_stage("sentiment_bars", symbol=currency, table="news_sentiment_hourly") as stage:
+        link_news_currency(news_df["id"], currency, engine=engine)
+        start, end = int(news_df["published_at"].min()), int(news_df["published_at"].max()) + 1
+        refresh_sentiment_bars(currency, start, end, engine=engine)
+        stage.add_rows(len(news_df))
+
+    logger.info(f"Updated {currency} sentiment bars of {len(news_df)} news items.")
+
+
+def candles_with_sentiment(
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    currency: Optional[str] = None,
+    engine: Engine = ENGINE,
+) -> pd.DataFrame:
+    """
+    Hourly candles of a symbol joined with the sentiment bars of its currency.
+
+    Parameters
+    ----------
+    symbol : str
+        The trading symbol (e.g., 'BTC/USDT:USDT').
+    start : datetime
+        First candle (inclusive, naive UTC).
+    end : datetime
+        Last candle (inclusive, naive UTC).
+    currency : str, optional
+        Currency of the sentiment bars. Default is the base currency of the symbol.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    pd.DataFrame
+        OHLCV columns plus ``news``, ``clusters`` and the summed vote columns
+        (zero for hours without news), ordered by ``timestamp``.
+    """
+    return QUERIES.select(
+        "candles_with_sentiment",
+        engine=engine,
+        symbol=symbol,
+        currency=currency or symbol_currency(symbol),
+        start=start,
+        end=end,
+    )
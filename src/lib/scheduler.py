@@ -0,0 +1,381 @@
+"""
+Module: scheduler.py
+Description: Background refresh of futures and news data with single-flight deduplication.
+
+The backend keeps every configured symbol and news currency fresh on a cadence. Manual
+refreshes (API, dashboard) and gap repairs go through the same single-flight group, keyed by
+what they write (e.g. ``futures:{symbol}``): identical calls that are already running are
+joined instead of started again, other calls for the same key start after the running one.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+from config.variables import (
+    FUTURES_BACKFILL_DAYS,
+    FUTURES_REFRESH_SECONDS,
+    FUTURES_SYMBOLS,
+    NEWS_CURRENCIES,
+    NEWS_REFRESH_SECONDS,
+    PARTITION_MAINTENANCE_SECONDS,
+    PARTITION_MONTHS_AHEAD,
+)
+from src.lib.crypto_news import update_news
+from src.lib.futures_data import update_futures_data
+from src.lib.news_index import NEWS_INDEX
+from src.utils.job_keys import NEWS_INDEX_JOB_KEY, PARTITIONS_JOB_KEY, futures_job_key, news_job_key
+from src.utils.loggerring import correlation_id, log_context, logger
+from src.utils.partitions import check_default_partition, ensure_partitions
+from src.utils.query_registry import QUERIES
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls with the same key into one execution.
+
+    Calls with the same key but other arguments (e.g. another date range of the same
+    symbol) are not joined, they are submitted once the call in flight is done so that
+    they never write the same rows concurrently. Calls run in a copy of the caller's
+    context, so their logs keep its correlation id.
+
+    Parameters
+    ----------
+    executor : ThreadPoolExecutor
+        Executor running the calls.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+        # key -> (future, call, turn), ``turn`` is done once the call ran or was skipped
+        self._in_flight: Dict[Hashable, Tuple[Future, Tuple, Future]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Start ``fn`` for ``key``, join the same call in flight or queue after another one.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future of the new call, or of the identical call already in flight.
+        """
+        call = (fn, args, tuple(sorted(kwargs.items())))
+        context = contextvars.copy_context()
+        future: Future = Future()
+        turn: Future = Future()
+        with self._lock:
+            running = self._in_flight.get(key)
+            if running is not None and running[1] == call and not running[0].cancelled():
+                return running[0]
+            self._in_flight[key] = (future, call, turn)
+
+        turn.add_done_callback(lambda _: self._forget(key, turn))
+        start = partial(self._start, future, turn, context, fn, *args, **kwargs)
+        if running is None:
+            start()
+        else:
+            # Chained rather than waited for, a waiting call would hold a worker thread
+            running[2].add_done_callback(lambda _: start())
+        return future
+
+    def _start(
+        self,
+        future: Future,
+        turn: Future,
+        context: contextvars.Context,
+        fn: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> None:
+        try:
+            work = self.executor.submit(_run, future, context, fn, *args, **kwargs)
+        except RuntimeError as e:  # executor shut down
+            if future.set_running_or_notify_cancel():
+                future.set_exception(e)
+            turn.set_result(None)
+            return
+        work.add_done_callback(lambda done: _finish(future, turn, done))
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run ``fn`` for ``key`` (or join the running call) and wait for its result.
+        """
+        return self.submit(key, fn, *args, **kwargs).result()
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._in_flight
+
+    def _forget(self, key: Hashable, turn: Future) -> None:
+        with self._lock:
+            running = self._in_flight.get(key)
+            if running is not None and running[2] is turn:
+                del self._in_flight[key]
+
+
+def _run(
+    future: Future, context: contextvars.Context, fn: Callable[..., Any], *args, **kwargs
+) -> None:
+    """Run ``fn`` in ``context`` for ``future``, unless the future was cancelled before."""
+    # Once running, the future can no longer be cancelled, so the next call of the key
+    # cannot start while this one still writes
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = context.run(fn, *args, **kwargs)
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+
+
+def _finish(future: Future, turn: Future, work: Future) -> None:
+    # A shutdown drops queued work before ``_run`` could settle the future
+    if work.cancelled():
+        future.cancel()
+    turn.set_result(None)
+
+
+@dataclass
+class RefreshJob:
+    """
+    A periodic refresh and its freshness status.
+    """
+
+    key: str
+    run: Callable[[], Optional[datetime]]
+    interval_seconds: float
+    first_run_delay: float = 0.0
+    next_run_at: float = 0.0
+    last_started_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    latest_data_at: Optional[datetime] = None
+    runs: int = field(default=0)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def refresh_futures(symbol: str) -> Optional[datetime]:
+    """
+    Fetch the candles of a symbol since its last stored day (or the backfill window).
+
+    Returns
+    -------
+    datetime or None
+        Latest stored candle after the refresh.
+    """
+    today = datetime.now()
+    last_timestamp = QUERIES.select("futures_bounds", symbol=symbol)["last_timestamp"].iloc[0]
+    if pd.isna(last_timestamp):
+        start = today - timedelta(days=FUTURES_BACKFILL_DAYS)
+    else:
+        start = pd.Timestamp(last_timestamp).to_pydatetime()
+
+    update_futures_data(symbol, start.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
+
+    latest = QUERIES.select("futures_bounds", symbol=symbol)["last_timestamp"].iloc[0]
+    return None if pd.isna(latest) else pd.Timestamp(latest).to_pydatetime()
+
+
+def refresh_news_index() -> Optional[datetime]:
+    """
+    Embed the news stored since the last run into the similar-news index.
+
+    Returns
+    -------
+    datetime or None
+        Publication time of the newest indexed news item.
+    """
+    latest = NEWS_INDEX.refresh()
+    return None if latest is None else datetime.fromtimestamp(latest, timezone.utc)
+
+
+def maintain_partitions() -> None:
+    """
+    Create the upcoming monthly partitions and warn about rows in the default partition.
+
+    Runs daily so that a backend up for longer than ``PARTITION_MONTHS_AHEAD`` months
+    keeps writing into monthly partitions.
+    """
+    ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD)
+    check_default_partition()
+
+
+def refresh_news(currency: str) -> Optional[datetime]:
+    """
+    Fetch the latest news page of a currency.
+
+    Returns
+    -------
+    datetime or None
+        Publication time of the newest stored news item after the refresh.
+    """
+    update_news(currency)
+
+    latest = QUERIES.select("news_watermark")["last_published_at"].iloc[0]
+    return None if pd.isna(latest) else datetime.fromtimestamp(int(latest), timezone.utc)
+
+
+class RefreshScheduler:
+    """
+    Runs refresh jobs on a cadence in a background thread.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Refreshes running at the same time. Default is 4.
+    tick_seconds : float, optional
+        How often due jobs are checked. Default is 5 seconds.
+    """
+
+    def __init__(self, max_workers: int = 4, tick_seconds: float = 5.0):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self.single_flight = SingleFlight(self.executor)
+        self.tick_seconds = tick_seconds
+        self.jobs: Dict[str, RefreshJob] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(
+        self,
+        key: str,
+        run: Callable[[], Optional[datetime]],
+        interval_seconds: float,
+        first_run_delay: float = 0.0,
+    ) -> None:
+        self.jobs[key] = RefreshJob(key, run, interval_seconds, first_run_delay)
+
+    def trigger(self, key: str) -> Future:
+        """
+        Run a job now, join its run in flight, or queue it after another call for its key.
+
+        Raises
+        ------
+        ValueError
+            If no job has this key.
+        """
+        job = self.jobs.get(key)
+        if job is None:
+            raise ValueError(f"Unknown refresh job: {key}")
+        return self.single_flight.submit(key, self._run_job, job)
+
+    def _run_job(self, job: RefreshJob) -> Optional[datetime]:
+        # Runs triggered by a request keep its correlation id, scheduled runs get their own
+        inherited = correlation_id.get()
+        prefix = job.key.replace(":", "-").replace("/", "-")
+        with log_context(None if inherited == "-" else inherited, prefix=prefix):
+            job.last_started_at = _utcnow()
+            job.runs += 1
+            try:
+                latest = job.run()
+            except Exception as e:
+                job.last_error = str(e)
+                logger.error(f"Refresh {job.key} failed: {e}")
+                raise
+            finally:
+                job.next_run_at = time.monotonic() + job.interval_seconds
+
+            job.last_success_at = _utcnow()
+            job.last_error = None
+            if latest is not None:
+                job.latest_data_at = latest
+            return latest
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in self.jobs.values():
+                if job.next_run_at <= now and not self.single_flight.in_flight(job.key):
+                    # Push the next check out until the run finishes and reschedules
+                    job.next_run_at = now + job.interval_seconds
+                    self.trigger(job.key)
+            self._stop.wait(self.tick_seconds)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        now = time.monotonic()
+        for job in self.jobs.values():
+            job.next_run_at = now + job.first_run_delay
+        self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Refresh scheduler started with {len(self.jobs)} jobs.")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> List[dict]:
+        """
+        Freshness status of every job.
+        """
+        now = time.monotonic()
+        return [
+            {
+                "key": job.key,
+                "running": self.single_flight.in_flight(job.key),
+                "runs": job.runs,
+                "last_started_at": job.last_started_at,
+                "last_success_at": job.last_success_at,
+                "last_error": job.last_error,
+                "latest_data_at": job.latest_data_at,
+                "next_run_in_seconds": max(0.0, job.next_run_at - now),
+            }
+            for job in self.jobs.values()
+        ]
+
+
+def _stagger(position: int, count: int, interval_seconds: float) -> float:
+    """First-run delay spreading ``count`` jobs of one cadence evenly over its interval."""
+    return interval_seconds * position / count
+
+
+def build_scheduler() -> RefreshScheduler:
+    """
+    Create the scheduler with one job per configured symbol and news currency.
+
+    Jobs of the same cadence start staggered over their interval rather than all on the
+    first tick, so that exchange and CryptoPanic requests are spread out.
+    """
+    scheduler = RefreshScheduler()
+    for position, symbol in enumerate(FUTURES_SYMBOLS):
+        scheduler.add_job(
+            futures_job_key(symbol),
+            lambda symbol=symbol: refresh_futures(symbol),
+            FUTURES_REFRESH_SECONDS,
+            _stagger(position, len(FUTURES_SYMBOLS), FUTURES_REFRESH_SECONDS),
+        )
+    for position, currency in enumerate(NEWS_CURRENCIES):
+        scheduler.add_job(
+            news_job_key(currency),
+            lambda currency=currency: refresh_news(currency),
+            NEWS_REFRESH_SECONDS,
+            _stagger(position, len(NEWS_CURRENCIES), NEWS_REFRESH_SECONDS),
+        )
+    scheduler.add_job(NEWS_INDEX_JOB_KEY, refresh_news_index, NEWS_REFRESH_SECONDS)
+    # Partitions are already maintained on startup, see the lifespan of src/main/app.py
+    scheduler.add_job(
+        PARTITIONS_JOB_KEY,
+        maintain_partitions,
+        PARTITION_MAINTENANCE_SECONDS,
+        PARTITION_MAINTENANCE_SECONDS,
+    )
+    return scheduler
+
+
+SCHEDULER = build_scheduler()
@@ -1,13 +1,51 @@
-from typing import Literal
+import asyncio
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Literal, Optional, Tuple
 
-from fastapi import FastAPI, Query
+import pandas as pd
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from config.variables import (
+    PARTITION_ARCHIVE_SCHEMA,
+    PARTITION_MONTHS_AHEAD,
+    PARTITION_RETENTION_MONTHS,
+    SCHEDULER_ENABLED,
+)
+from src.lib.candle_gaps import find_gaps, gap_coverage, last_closed_hour, repair_gaps
 from src.lib.crypto_news import update_news
 from src.lib.futures_data import update_futures_data
-from src.utils.loggerring import logger
+from src.lib.news_dedup import NEWS_DEDUP, dedup_ratio
+from src.lib.news_index import NEWS_INDEX, similar_news
+from src.lib.news_sentiment import candles_with_sentiment
+from src.lib.scheduler import SCHEDULER
+from src.utils.http_cache import ALL_SCOPES, CACHE, etag_matches, make_etag
+from src.utils.job_keys import NEWS_INDEX_JOB_KEY, futures_job_key, news_job_key
+from src.utils.loggerring import log_context, logger
+from src.utils.metrics import render_metrics
+from src.utils.migrations import apply_migrations
+from src.utils.partitions import check_default_partition, detach_old_partitions, ensure_partitions
+from src.utils.query_registry import QUERIES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Apply migrations, maintain partitions and run the background refresh."""
+    apply_migrations()
+    ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD)
+    check_default_partition()
+    if PARTITION_RETENTION_MONTHS > 0:
+        detach_old_partitions(PARTITION_RETENTION_MONTHS, archive_schema=PARTITION_ARCHIVE_SCHEMA)
+    if SCHEDULER_ENABLED:
+        SCHEDULER.start()
+    yield
+    SCHEDULER.stop()
+    NEWS_INDEX.save()
 
-app = FastAPI(title="Crypto Analytics API")
+
+app = FastAPI(title="Crypto Analytics API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -19,6 +57,15 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def correlate_request(request: Request, call_next):
+    """Tag the logs of each request with its X-Request-ID (generated if missing)."""
+    with log_context(request.headers.get("X-Request-ID"), prefix="req") as request_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Crypto Analytics API"}
@@ -32,26 +79,264 @@ async def update_futures(
 ):
     """Update futures OHLCV data in the database."""
     try:
-        update_futures_data(symbol, start_date, end_date)
+        # Identical updates already running are joined instead of fetched again, other
+        # writes of the symbol (scheduled refresh, gap repair) run one after another
+        await asyncio.wrap_future(
+            SCHEDULER.single_flight.submit(
+                futures_job_key(symbol),
+                update_futures_data,
+                symbol,
+                start_date,
+                end_date,
+            )
+        )
         return {"status": "success", "message": f"Futures data updated for {symbol}"}
     except Exception as e:
         logger.error(f"Error updating futures data: {str(e)}")
         return {"status": "error", "message": str(e)}
 
 
+def _parse_day(date: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD date, optionally as the last closed hour of that day."""
+    if not date:
+        return None
+    day = datetime.strptime(date, "%Y-%m-%d")
+    if end_of_day:
+        return min(day + timedelta(hours=23), last_closed_hour())
+    return day
+
+
+@app.get("/api/futures/gaps")
+def futures_gaps(
+    symbol: str = Query(..., description="Trading symbol (e.g., 'BTC/USDT:USDT')"),
+    start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+):
+    """Missing hours of a symbol and the coverage of its hourly history."""
+    try:
+        start, end = _parse_day(start_date), _parse_day(end_date, end_of_day=True)
+        gaps = find_gaps(symbol, start, end)
+        return {
+            "status": "success",
+            "coverage": gap_coverage(symbol, start, end),
+            "gaps": gaps.to_dict(orient="records"),
+        }
+    except Exception as e:
+        logger.error(f"Error scanning futures gaps: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@app.post("/api/futures/gaps/repair")
+async def repair_futures_gaps(
+    symbol: str = Query(..., description="Trading symbol (e.g., 'BTC/USDT:USDT')"),
+    start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+):
+    """Fetch and store only the missing hours of a symbol."""
+    try:
+        start, end = _parse_day(start_date), _parse_day(end_date, end_of_day=True)
+        report = await asyncio.wrap_future(
+            SCHEDULER.single_flight.submit(futures_job_key(symbol), repair_gaps, symbol, start, end)
+        )
+        return {"status": "success", "report": report}
+    except Exception as e:
+        logger.error(f"Error repairing futures gaps: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@app.get("/api/futures/sentiment")
+def futures_with_sentiment(
+    symbol: str = Query(..., description="Trading symbol (e.g., 'BTC/USDT:USDT')"),
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    currency: Optional[str] = Query(None, description="News currency, default from the symbol"),
+):
+    """Hourly candles joined with the news-sentiment bars of the same hours."""
+    try:
+        start, end = _parse_day(start_date), _parse_day(end_date, end_of_day=True)
+        data = candles_with_sentiment(symbol, start, end, currency=currency)
+        return {
+            "status": "success",
+            "data": data.to_dict(orient="records"),
+        }
+    except Exception as e:
+        logger.error(f"Error reading candles with sentiment: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
 @app.post("/api/news/update")
 async def update_crypto_news(
     currency: Literal["BTC", "ETH", "SOL"] = Query("BTC", description="Currency to fetch news for")
 ):
     """Update crypto news data in the database."""
     try:
-        update_news(currency)
+        key = news_job_key(currency)
+        if key in SCHEDULER.jobs:
+            future = SCHEDULER.trigger(key)
+        else:
+            future = SCHEDULER.single_flight.submit(key, update_news, currency)
+        await asyncio.wrap_future(future)
         return {"status": "success", "message": f"News data updated for {currency}"}
     except Exception as e:
         logger.error(f"Error updating news data: {str(e)}")
         return {"status": "error", "message": str(e)}
 
 
+def _cached_read(
+    key: Tuple,
+    if_none_match: Optional[str],
+    load: Callable[[], pd.DataFrame],
+    watermark_column: str,
+) -> Response:
+    """
+    Serve a read from the response cache, answering a matching If-None-Match with 304.
+
+    On a miss ``load`` queries the rows and the serialised payload is cached. The ETag is
+    made of the latest ``watermark_column`` value and a checksum of the rows, the latter
+    catches backfilled rows (e.g. repaired gaps) that do not move the watermark.
+    """
+    entry = CACHE.get(key)
+    if entry is None:
+        generation = CACHE.generation(key)
+        data = load()
+        watermark = data[watermark_column].max() if not data.empty else None
+        records = data.to_json(orient="records", date_format="iso")
+        body = f'{{"status": "success", "data": {records}}}'.encode()
+        etag = make_etag(*key, watermark, zlib.crc32(body))
+        entry = CACHE.put(key, etag, body, generation)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        CACHE.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/futures/latest")
+def latest_futures(
+    symbol: str = Query(..., description="Trading symbol (e.g., 'BTC/USDT:USDT')"),
+    limit: int = Query(200, ge=1, le=5000, description="Latest candles to return"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Latest candles of a symbol, with an ETag of its newest stored candle."""
+    try:
+        return _cached_read(
+            ("futures_ohlcv", symbol, limit),
+            if_none_match,
+            lambda: QUERIES.select("latest_futures_candles", symbol=symbol, limit=limit),
+            "timestamp",
+        )
+    except Exception as e:
+        logger.error(f"Error reading futures data: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@app.get("/api/news/latest")
+def latest_crypto_news(if_none_match: Optional[str] = Header(None)):
+    """Latest stored news, with an ETag of the newest publication time."""
+    try:
+        return _cached_read(
+            ("crypto_news", ALL_SCOPES),
+            if_none_match,
+            lambda: QUERIES.select("latest_news"),
+            "published_at",
+        )
+    except Exception as e:
+        logger.error(f"Error reading news data: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@app.get("/api/news/dedup")
+def news_dedup_stats(
+    hours: Optional[float] = Query(24, gt=0, description="Only news of the last hours"),
+):
+    """Share of stored news collapsed into near-duplicate clusters."""
+    try:
+        return {"status": "success", "stored": dedup_ratio(hours), "index": NEWS_DEDUP.stats()}
+    except Exception as e:
+        logger.error(f"Error computing news dedup ratio: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@app.get("/api/news/similar")
+def similar_crypto_news(
+    headline: str = Query(..., min_length=3, description="Headline to find similar news for"),
+    symbol: str = Query("BTC/USDT:USDT", description="Symbol of the price reactions"),
+    k: int = Query(10, ge=1, le=100, description="Number of similar news"),
+):
+    """Most similar past news with the price change 1h, 6h and 24h after each of them."""
+    try:
+        if not len(NEWS_INDEX):
+            # Embedding the corpus takes minutes, it runs as the scheduler's index job
+            if NEWS_INDEX_JOB_KEY in SCHEDULER.jobs:
+                SCHEDULER.trigger(NEWS_INDEX_JOB_KEY)
+            else:
+                SCHEDULER.single_flight.submit(NEWS_INDEX_JOB_KEY, NEWS_INDEX.refresh)
+            return {
+                "status": "building",
+                "message": "The similar-news index is being built, retry shortly",
+                "indexed": 0,
+            }
+        matches = similar_news(headline, symbol, k)
+        return {
+            "status": "success",
+            "indexed": len(NEWS_INDEX),
+            "results": matches.astype(object).where(matches.notna(), None).to_dict("records"),
+        }
+    except Exception as e:
+        logger.error(f"Error searching similar news: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@app.get("/api/stats/cache")
+async def cache_stats():
+    """Hit rate and size of the API response cache."""
+    return CACHE.stats()
+
+
+@app.get("/api/refresh/status")
+async def refresh_status():
+    """Freshness of every background refresh job."""
+    return SCHEDULER.status()
+
+
+@app.post("/api/refresh")
+async def trigger_refresh(
+    symbol: Optional[str] = Query(None, description="Trading symbol (e.g., 'BTC/USDT:USDT')"),
+    currency: Optional[str] = Query(None, description="News currency (e.g., 'BTC')"),
+):
+    """Start the refresh jobs of a symbol and/or currency without waiting for them."""
+    keys = []
+    if symbol:
+        keys.append(futures_job_key(symbol))
+    if currency:
+        keys.append(news_job_key(currency))
+
+    try:
+        joined = [key for key in keys if SCHEDULER.single_flight.in_flight(key)]
+        for key in keys:
+            SCHEDULER.trigger(key)
+        return {"status": "accepted", "jobs": keys, "joined": joined}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of the ingestion, database and inference stages."""
+    try:
+        body, content_type = render_metrics()
+    except RuntimeError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/api/stats/queries")
+async def query_stats():
+    """Call counts and latency of the registered SQL queries."""
+    return QUERIES.stats().to_dict(orient="records")
+
+
 def start_api():
     import uvicorn
 
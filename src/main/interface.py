@@ -1,11 +1,15 @@
 from datetime import datetime, timedelta
+from typing import List, Optional
 
 import pandas as pd
 import plotly.graph_objects as go
+import requests
 import streamlit as st
 
-from src.lib.crypto_news import latest_news, update_news
-from src.lib.futures_data import get_latest_futures_data, update_futures_data
+from config.variables import BACKEND_URL
+from src.lib.crypto_news import latest_news
+from src.lib.news_sentiment import candles_with_sentiment
+from src.utils.job_keys import futures_job_key, news_job_key
 
 st.set_page_config(page_title="Crypto Analytics Dashboard", page_icon="📊", layout="wide")
 
@@ -45,6 +49,24 @@ def plot_candlestick(df, symbol):
     return fig
 
 
+def plot_sentiment(df, currency):
+    """Create a bar chart of the hourly positive and negative news votes."""
+    fig = go.Figure(
+        data=[
+            go.Bar(x=df["timestamp"], y=df["positive"], name="Positive", marker_color="green"),
+            go.Bar(x=df["timestamp"], y=-df["negative"], name="Negative", marker_color="red"),
+        ]
+    )
+    fig.update_layout(
+        title=f"Hourly {currency} news votes",
+        xaxis_title="Date",
+        yaxis_title="Votes",
+        barmode="relative",
+        height=300,
+    )
+    return fig
+
+
 def display_news_table(news_df):
     """Display news items in a formatted table."""
     if news_df.empty:
@@ -83,6 +105,48 @@ def display_news_table(news_df):
         st.warning("News data has unexpected format")
 
 
+def fetch_refresh_status() -> Optional[List[dict]]:
+    """Freshness of the background refresh jobs, None if the backend is unreachable."""
+    try:
+        response = requests.get(f"{BACKEND_URL}/api/refresh/status", timeout=5)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return None
+
+
+def trigger_refresh(symbol: str, currency: str) -> dict:
+    """Ask the backend to refresh a symbol and currency, without waiting for the result."""
+    response = requests.post(
+        f"{BACKEND_URL}/api/refresh", params={"symbol": symbol, "currency": currency}, timeout=5
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def display_freshness(status: Optional[List[dict]], keys: List[str]):
+    """Show when the data of the selected symbol was last refreshed."""
+    if status is None:
+        st.warning(f"Backend at {BACKEND_URL} is unreachable, showing stored data.")
+        return
+
+    jobs = {job["key"]: job for job in status}
+    for column, key in zip(st.columns(len(keys)), keys):
+        job = jobs.get(key)
+        with column:
+            if job is None:
+                st.info(f"{key}: not refreshed in the background")
+            elif job["running"]:
+                st.info(f"{key}: refreshing...")
+            elif job["last_error"]:
+                st.error(f"{key}: last refresh failed: {job['last_error']}")
+            else:
+                st.caption(
+                    f"{key}: refreshed at {job['last_success_at'] or 'never'}, "
+                    f"latest data {job['latest_data_at'] or 'unknown'}"
+                )
+
+
 def main():
     st.title("Crypto News Prediction Interface")
 
@@ -105,37 +169,40 @@ def main():
         start_date = st.date_input("Start Date", value=datetime.strptime(start_default, "%Y-%m-%d"))
         end_date = st.date_input("End Date", value=datetime.strptime(end_default, "%Y-%m-%d"))
 
+    # Data is refreshed by the backend scheduler, the button only asks for an early run
     if st.button("Refresh Data"):
-        with st.spinner("Updating market data..."):
-            try:
-                update_futures_data(
-                    futures_symbol,
-                    start_date.strftime("%Y-%m-%d"),
-                    end_date.strftime("%Y-%m-%d"),
-                )
-                update_news(user_symbol)
-                st.success(f"Market data updated successfully for {futures_symbol}")
-                st.rerun()
-            except Exception as e:
-                st.error(f"Failed to update market data: {e}")
+        try:
+            result = trigger_refresh(futures_symbol, user_symbol)
+            if result.get("status") == "error":
+                st.error(f"Failed to start the refresh: {result['message']}")
+            else:
+                st.success(f"Refresh started for {futures_symbol}, reload to see new data")
+        except requests.RequestException as e:
+            st.error(f"Failed to reach the backend: {e}")
+
+    display_freshness(
+        fetch_refresh_status(), [futures_job_key(futures_symbol), news_job_key(user_symbol)]
+    )
 
     st.markdown("---")
 
     st.header("Futures Market Data")
 
-    # Get data directly from the function instead of API
-    data_df = get_latest_futures_data(futures_symbol)
+    # Candles and hourly sentiment bars come joined from the database
+    data_df = candles_with_sentiment(
+        futures_symbol,
+        datetime.combine(start_date, datetime.min.time()),
+        datetime.combine(end_date, datetime.max.time()),
+    )
+
     if not data_df.empty:
         st.success(f"Data retrieved for {futures_symbol}")
         fig = plot_candlestick(data_df, futures_symbol)
         if fig:
             st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(plot_sentiment(data_df, user_symbol), use_container_width=True)
     else:
-        update_futures_data(
-            futures_symbol,
-            start_date=(today - timedelta(days=10)).strftime("%Y-%m-%d"),
-            end_date=(today - timedelta(days=1)).strftime("%Y-%m-%d"),
-        )
+        st.info(f"No stored candles for {futures_symbol} in this range yet.")
 
     st.markdown("---")
 
@@ -145,7 +212,7 @@ def main():
         st.success("Latest news retrieved")
         display_news_table(news_df)
     else:
-        update_news(user_symbol)
+        st.info("No stored news yet.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""
+Module: http_cache.py
+Description: In-process LRU cache with TTL for serialised API responses and their ETags.
+
+Read endpoints cache the serialised payload under a key ``(table, scope, *variant)``, where
+``scope`` is the symbol (or "*" for table-wide reads). The ETag of a payload is derived from
+the data watermark (latest ``timestamp`` / ``published_at``), so it only changes when new data
+arrives. While an entry is cached, ``If-None-Match`` is answered without querying the database.
+
+Every ``upload`` and every other write reported with ``notify_write`` (bulk COPY imports,
+maintenance statements) calls ``invalidate_on_write``, which drops the entries of the written
+table and symbols. Writes from other processes are picked up when the entry expires after the TTL.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from config.variables import HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_TTL_SECONDS
+from src.utils.sql_operators import add_write_listener
+
+ALL_SCOPES = "*"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    A serialised response body with its ETag.
+    """
+
+    etag: str
+    body: bytes
+    expires_at: float
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the parts identifying a payload version.
+    """
+    digest = hashlib.sha1(":".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an ``If-None-Match`` header against an ETag (weak comparison, as in RFC 9110).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (
+        candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates
+    )
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of serialised responses with a time to live.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Entries kept before the least recently used one is evicted.
+    ttl_seconds : float, optional
+        Lifetime of an entry.
+    """
+
+    def __init__(
+        self, max_entries: int = HTTP_CACHE_MAX_ENTRIES, ttl_seconds: float = HTTP_CACHE_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CachedResponse]" = OrderedDict()
+        # Bumped on every write, a load that started before a write must not be stored
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CachedResponse]:
+        """
+        Return the live entry of ``key`` and mark it as recently used, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _generation(self, key: Tuple[Hashable, ...]) -> Tuple[int, int]:
+        # Callers hold the lock
+        table, scope = key[0], key[1]
+        return self._generations.get((table, None), 0), self._generations.get((table, scope), 0)
+
+    def generation(self, key: Tuple[Hashable, ...]) -> Tuple[int, int]:
+        """
+        Write generation of the table and scope of ``key``, pass it to ``put``.
+        """
+        with self._lock:
+            return self._generation(key)
+
+    def put(
+        self, key: Tuple[Hashable, ...], etag: str, body: bytes, generation: Tuple[int, int]
+    ) -> CachedResponse:
+        """
+        Store a response loaded at ``generation``.
+
+        The entry is not stored when the table or scope was written to since then,
+        so a payload read before a write cannot outlive it.
+        """
+        entry = CachedResponse(etag, body, time.monotonic() + self.ttl_seconds)
+        # Checked under the same lock as the store, an invalidation cannot slip in between
+        with self._lock:
+            if self._generation(key) != generation:
+                return entry
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self, table: str, scopes: Optional[Iterable[Hashable]] = None) -> int:
+        """
+        Drop the entries of a table, or only of some of its scopes.
+
+        Table-wide entries (scope "*") are always dropped.
+
+        Returns
+        -------
+        int
+            Number of dropped entries.
+        """
+        scopes = None if scopes is None else set(scopes) | {ALL_SCOPES}
+        with self._lock:
+            for scope in scopes or [None]:
+                self._generations[(table, scope)] = self._generations.get((table, scope), 0) + 1
+
+            stale = [
+                key
+                for key in self._entries
+                if key[0] == table and (scopes is None or key[1] in scopes)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Hit rate and size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+CACHE = ResponseCache()
+
+
+def invalidate_on_write(table_name: str, data: pd.DataFrame) -> None:
+    """
+    Write listener dropping the cached responses affected by an upload.
+    """
+    if "symbol" in data.columns:
+        CACHE.invalidate(table_name, data["symbol"].unique().tolist())
+    else:
+        CACHE.invalidate(table_name)
+
+
+add_write_listener(invalidate_on_write)
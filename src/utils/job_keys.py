@@ -0,0 +1,19 @@
+"""
+Module: job_keys.py
+Description: Keys of the background refresh jobs, shared by the backend and the dashboard.
+
+A key names what a job writes, so the scheduler, manual updates and gap repairs of the same
+data use the same single-flight key. Kept free of heavy imports so that the dashboard can
+build keys without loading the scheduler.
+"""
+
+NEWS_INDEX_JOB_KEY = "index:news"
+PARTITIONS_JOB_KEY = "maintenance:partitions"
+
+
+def futures_job_key(symbol: str) -> str:
+    return f"futures:{symbol}"
+
+
+def news_job_key(currency: str) -> str:
+    return f"news:{currency}"
@@ -1,22 +1,238 @@
+"""
+Module: loggerring.py
+Description: Project logger with non-blocking queue-based handlers and structured JSON log files.
+
+Log calls only put the record on a queue, a background listener thread writes it to stdout
+and to ``logs/app.log`` (JSON lines). Records carry the correlation id of the current job
+or request, set with ``log_context``. Repeated warnings from the same line are sampled.
+Forked child processes (e.g. bulk import workers) have no listener thread, they write to
+stdout and to their own ``logs/app.<pid>.log`` directly.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterator, Optional, Tuple
+
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "app.log")
+
+# Warnings from one source line beyond this many per interval are dropped and counted
+SAMPLE_BURST = 5
+SAMPLE_INTERVAL_SECONDS = 60.0
+
+correlation_id: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+# Attributes of every LogRecord, anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "correlation_id",
+    "suppressed",
+}
+
+
+@contextmanager
+def log_context(value: Optional[str] = None, prefix: str = "job") -> Iterator[str]:
+    """
+    Tag all log records emitted inside the block with a correlation id.
+
+    Parameters
+    ----------
+    value : str, optional
+        Correlation id to use, e.g. an incoming ``X-Request-ID``. Default is a new id.
+    prefix : str, optional
+        Prefix of a generated id. Default is "job".
+
+    Yields
+    ------
+    str
+        The correlation id.
+    """
+    value = value or f"{prefix}-{uuid.uuid4().hex[:12]}"
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+
+class CorrelationFilter(logging.Filter):
+    """
+    Attach the current correlation id to the record, in the thread that logged it.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through at most ``burst`` records per source line and interval at one level.
+
+    The first record passed in a new interval notes how many were dropped before it.
+
+    Parameters
+    ----------
+    level : int, optional
+        Only records of exactly this level are sampled. Default is WARNING.
+    burst : int, optional
+        Records allowed per source line and interval.
+    interval : float, optional
+        Interval length in seconds.
+    """
+
+    def __init__(
+        self,
+        level: int = logging.WARNING,
+        burst: int = SAMPLE_BURST,
+        interval: float = SAMPLE_INTERVAL_SECONDS,
+    ):
+        super().__init__()
+        self.level = level
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != self.level:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            window = self._windows.setdefault(key, [now, 0, 0])  # start, passed, suppressed
+            if now - window[0] >= self.interval:
+                suppressed = window[2]
+                window[:] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                    record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Queue handler that keeps the message and traceback apart for the JSON formatter.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
 
 formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    "%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
 )
 
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setFormatter(formatter)
 console_handler.setLevel(logging.INFO)
 
-file_handler = RotatingFileHandler("logs/app.log", maxBytes=10 * 1024 * 1024, backupCount=5)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.DEBUG)
+handlers = [console_handler]
+
+file_handler: Optional[RotatingFileHandler] = None
+try:
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5)
+    file_handler.setFormatter(JsonFormatter())
+    file_handler.setLevel(logging.DEBUG)
+    handlers.append(file_handler)
+except OSError as e:
+    print(f"File logging disabled, cannot write to {LOG_FILE}: {e}", file=sys.stderr)
+
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+queue_handler = _RecordQueueHandler(log_queue)
+queue_handler.addFilter(CorrelationFilter())
+queue_handler.addFilter(SamplingFilter())
+
+listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+logger.addHandler(queue_handler)
 
 logger.propagate = False
+
+
+def _log_directly_in_child() -> None:
+    """
+    Replace the queue handler by direct handlers in a forked child.
+
+    The listener thread is not inherited by ``fork``, records queued in the child would never
+    be written. Worker processes also exit without running ``atexit``, so nothing may be left
+    in a queue when they end. The child writes JSON lines to its own ``logs/app.<pid>.log``
+    rather than the parent's rotating file, which only one process may roll over.
+    """
+    if queue_handler not in logger.handlers:
+        return
+    logger.removeHandler(queue_handler)
+    logger.addFilter(CorrelationFilter())
+    logger.addFilter(SamplingFilter())
+    logger.addHandler(console_handler)
+    if file_handler is not None:
+        child_handler = logging.FileHandler(
+            os.path.join(LOG_DIR, f"app.{os.getpid()}.log"), delay=True
+        )
+        child_handler.setFormatter(JsonFormatter())
+        child_handler.setLevel(logging.DEBUG)
+        logger.addHandler(child_handler)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_log_directly_in_child)
@@ -0,0 +1,153 @@
+"""
+Module: migrations.py
+Description: Versioned schema migrations for the project database.
+
+Run with ``python -m src.utils.migrations``. The FastAPI app also applies
+pending migrations on startup.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List
+
+from sqlalchemy import Engine, text
+
+from config.database import ENGINE
+from src.utils.loggerring import logger
+from src.utils.partitions import ensure_partitions, migrate_futures_ohlcv_to_partitions
+from src.utils.sql_operators import execute, get_query_from_sql_file, select
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Arbitrary key for pg_advisory_lock so that concurrent workers migrate one at a time
+MIGRATIONS_LOCK_KEY = 20250326
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    A single schema migration.
+
+    Attributes
+    ----------
+    version : int
+        Monotonically increasing migration number.
+    name : str
+        Short description stored in the migrations table.
+    apply : Callable[[Engine], None]
+        Function applying the migration. Must be safe to re-run after a failure.
+    """
+
+    version: int
+    name: str
+    apply: Callable[[Engine], None]
+
+
+def run_sql_file(path: str) -> Callable[[Engine], None]:
+    """
+    Migration step executing an idempotent SQL script.
+    """
+    return lambda engine: execute(get_query_from_sql_file(path), engine=engine)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "futures_ohlcv_partitioned",
+        lambda engine: migrate_futures_ohlcv_to_partitions(engine=engine),
+    ),
+    Migration(
+        2,
+        "crypto_news_cluster_id",
+        run_sql_file("queries/migrations/002_crypto_news_cluster_id.sql"),
+    ),
+    Migration(
+        3,
+        "news_sentiment_hourly",
+        run_sql_file("queries/migrations/003_news_sentiment_hourly.sql"),
+    ),
+    Migration(
+        4,
+        "bulk_import_progress",
+        run_sql_file("queries/migrations/004_bulk_import_progress.sql"),
+    ),
+]
+
+
+def create_migrations_table(engine: Engine = ENGINE) -> None:
+    """
+    Create the table that records applied migrations if it does not exist.
+    """
+    execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        engine=engine,
+    )
+
+
+def applied_versions(engine: Engine = ENGINE) -> List[int]:
+    """
+    Return the versions of all applied migrations.
+    """
+    applied = select(f"SELECT version FROM {MIGRATIONS_TABLE}", engine=engine)
+    return applied["version"].tolist()
+
+
+def apply_migrations(engine: Engine = ENGINE) -> List[int]:
+    """
+    Apply all pending migrations in version order.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    List[int]
+        Versions applied by this call.
+    """
+    create_migrations_table(engine)
+
+    applied = []
+    with engine.connect() as lock_connection:
+        lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        try:
+            done = set(applied_versions(engine))
+            for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                if migration.version in done:
+                    continue
+
+                logger.info(f"Applying migration {migration.version}: {migration.name}")
+                migration.apply(engine)
+                execute(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (version, name) VALUES (:version, :name)",
+                    params={"version": migration.version, "name": migration.name},
+                    engine=engine,
+                )
+                applied.append(migration.version)
+        finally:
+            lock_connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY}
+            )
+            lock_connection.commit()
+
+    if applied:
+        logger.info(f"Applied migrations: {applied}")
+    return applied
+
+
+def main() -> None:
+    """
+    Apply pending migrations and make sure upcoming partitions exist.
+    """
+    apply_migrations()
+    ensure_partitions()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+Module: partitions.py
+Description: Monthly range partition management for the futures_ohlcv table.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import pandas as pd
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.database import ENGINE
+from src.utils.loggerring import logger
+from src.utils.sql_operators import execute, format_sql, get_query_from_sql_file, select
+
+TABLE_NAME = "futures_ohlcv"
+DEFAULT_PARTITION = f"{TABLE_NAME}_default"
+STAGING_TABLE = f"{TABLE_NAME}_partitioned"
+LEGACY_TABLE = f"{TABLE_NAME}_legacy"
+
+OHLCV_COLUMNS = "symbol, timestamp, open, high, low, close, volume"
+
+
+def month_start(value: datetime) -> datetime:
+    """
+    Truncate a datetime to the first moment of its month.
+
+    Parameters
+    ----------
+    value : datetime
+        Any datetime. Timezone information is dropped.
+
+    Returns
+    -------
+    datetime
+        Naive datetime at 00:00 of the first day of the month.
+    """
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """
+    Shift a month start by a number of months.
+
+    Parameters
+    ----------
+    month : datetime
+        First day of a month.
+    months : int
+        Number of months to shift by, may be negative.
+
+    Returns
+    -------
+    datetime
+        First day of the shifted month.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    """
+    Build the partition name for a given month, e.g. ``futures_ohlcv_p202503``.
+
+    Partitions keep this name whichever parent they are attached to, so the
+    staging table used by the migration can be swapped in without renames.
+    """
+    return f"{TABLE_NAME}_p{month:%Y%m}"
+
+
+def _current_month() -> datetime:
+    return month_start(datetime.now(timezone.utc))
+
+
+def relation_kind(table_name: str, engine: Engine = ENGINE) -> Optional[str]:
+    """
+    Return ``pg_class.relkind`` for a table or None if it does not exist.
+
+    ``'r'`` is a regular heap table and ``'p'`` is a partitioned table.
+    """
+    query = "SELECT relkind FROM pg_class WHERE oid = to_regclass(:table_name)"
+    result = select(query, params={"table_name": table_name}, engine=engine)
+    if result.empty:
+        return None
+    return result["relkind"].iloc[0]
+
+
+def list_partitions(table_name: str = TABLE_NAME, engine: Engine = ENGINE) -> pd.DataFrame:
+    """
+    List the monthly partitions attached to a partitioned table.
+
+    Parameters
+    ----------
+    table_name : str, optional
+        Partitioned parent table. Default is "futures_ohlcv".
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``partition_name`` and ``month``, sorted by month. The default
+        partition is not included.
+    """
+    query = """
+        SELECT c.relname AS partition_name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table_name)
+    """
+    partitions = select(format_sql(query), params={"table_name": table_name}, engine=engine)
+    prefix = f"{TABLE_NAME}_p"
+    partitions = partitions[partitions["partition_name"].str.startswith(prefix)].copy()
+    partitions["month"] = pd.to_datetime(
+        partitions["partition_name"].str[len(prefix) :], format="%Y%m"
+    )
+    return partitions.sort_values("month").reset_index(drop=True)
+
+
+def create_partition(month: datetime, table_name: str = TABLE_NAME, engine: Engine = ENGINE) -> str:
+    """
+    Create the partition for one month, moving matching rows out of the default partition.
+
+    Parameters
+    ----------
+    month : datetime
+        Any datetime inside the month to create.
+    table_name : str, optional
+        Partitioned parent table. Default is "futures_ohlcv".
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    str
+        Name of the partition.
+
+    Notes
+    -----
+    PostgreSQL refuses to attach a partition whose range overlaps rows already
+    stored in the default partition. In that case the default partition is
+    detached, the rows are moved and it is re-attached in the same transaction.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    create_query = (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+        f"FOR VALUES FROM ('{bounds['lower']:%Y-%m-%d}') TO ('{bounds['upper']:%Y-%m-%d}')"
+    )
+
+    stranded_query = f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {DEFAULT_PARTITION}
+            WHERE timestamp >= :lower AND timestamp < :upper
+        ) AS stranded
+    """
+    stranded = relation_kind(DEFAULT_PARTITION, engine) is not None and bool(
+        select(format_sql(stranded_query), params=bounds, engine=engine)["stranded"].iloc[0]
+    )
+
+    if not stranded:
+        execute(create_query, engine=engine)
+        return name
+
+    try:
+        with engine.connect() as connection:
+            with connection.begin():
+                connection.execute(
+                    text(f"ALTER TABLE {table_name} DETACH PARTITION {DEFAULT_PARTITION}")
+                )
+                connection.execute(text(create_query))
+                connection.execute(
+                    text(
+                        f"INSERT INTO {name} ({OHLCV_COLUMNS}) "
+                        f"SELECT {OHLCV_COLUMNS} FROM {DEFAULT_PARTITION} "
+                        f"WHERE timestamp >= :lower AND timestamp < :upper"
+                    ),
+                    bounds,
+                )
+                connection.execute(
+                    text(
+                        f"DELETE FROM {DEFAULT_PARTITION} "
+                        f"WHERE timestamp >= :lower AND timestamp < :upper"
+                    ),
+                    bounds,
+                )
+                connection.execute(
+                    text(f"ALTER TABLE {table_name} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+                )
+    except SQLAlchemyError as e:
+        logger.error(f"Error creating partition {name}: {e}")
+        raise Exception(f"Error creating partition {name}: {e}")
+
+    logger.info(f"Created partition {name} and moved rows from {DEFAULT_PARTITION}.")
+    return name
+
+
+def ensure_partitions(
+    months_ahead: int = 3,
+    start: Optional[datetime] = None,
+    table_name: str = TABLE_NAME,
+    engine: Engine = ENGINE,
+) -> List[str]:
+    """
+    Create any missing monthly partitions up to ``months_ahead`` months in the future.
+
+    Parameters
+    ----------
+    months_ahead : int, optional
+        How many months after the current one to pre-create. Default is 3.
+    start : datetime, optional
+        First month to cover. Default is the current month.
+    table_name : str, optional
+        Partitioned parent table. Default is "futures_ohlcv".
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    List[str]
+        Names of the partitions that were created.
+    """
+    current_month = _current_month()
+    month = month_start(start) if start else current_month
+    last_month = add_months(current_month, months_ahead)
+
+    existing = set(list_partitions(table_name, engine)["partition_name"])
+
+    created = []
+    while month <= last_month:
+        name = partition_name(month)
+        if name not in existing:
+            create_partition(month, table_name, engine)
+            created.append(name)
+        month = add_months(month, 1)
+
+    if created:
+        logger.info(f"Created {len(created)} partitions for {table_name}: {', '.join(created)}")
+    return created
+
+
+def check_default_partition(table_name: str = TABLE_NAME, engine: Engine = ENGINE) -> pd.DataFrame:
+    """
+    Count the rows stored in the default partition, per month, and warn if there are any.
+
+    Rows only land in the default partition when their month has no partition yet, which
+    loses partition pruning and BRIN locality. ``ensure_partitions`` with a ``start`` at
+    the reported month moves them into a proper partition.
+
+    Parameters
+    ----------
+    table_name : str, optional
+        Partitioned parent table. Default is "futures_ohlcv".
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``month`` and ``rows``, empty if the default partition is empty.
+    """
+    default_partition = f"{table_name}_default"
+    if relation_kind(default_partition, engine) is None:
+        return pd.DataFrame(columns=["month", "rows"])
+
+    stranded = select(
+        f"SELECT date_trunc('month', timestamp) AS month, COUNT(*) AS rows "
+        f"FROM {default_partition} GROUP BY 1 ORDER BY 1",
+        engine=engine,
+    )
+    if not stranded.empty:
+        months = ", ".join(
+            f"{row.month:%Y-%m} ({row.rows})" for row in stranded.itertuples(index=False)
+        )
+        logger.warning(
+            f"{int(stranded['rows'].sum())} rows of {table_name} are stored in "
+            f"{default_partition}: {months}"
+        )
+    return stranded
+
+
+def detach_old_partitions(
+    retention_months: int,
+    archive_schema: Optional[str] = None,
+    drop: bool = False,
+    table_name: str = TABLE_NAME,
+    engine: Engine = ENGINE,
+) -> List[str]:
+    """
+    Detach partitions older than the retention window and optionally archive or drop them.
+
+    Parameters
+    ----------
+    retention_months : int
+        Number of full months to keep attached before the current one.
+    archive_schema : str, optional
+        Move detached partitions into this schema instead of leaving them in "public".
+    drop : bool, optional
+        Drop detached partitions. Takes precedence over ``archive_schema``. Default is False.
+    table_name : str, optional
+        Partitioned parent table. Default is "futures_ohlcv".
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Returns
+    -------
+    List[str]
+        Names of the partitions that were detached.
+    """
+    cutoff = add_months(_current_month(), -retention_months)
+    partitions = list_partitions(table_name, engine)
+    expired = partitions[partitions["month"] < cutoff]["partition_name"].tolist()
+
+    if archive_schema and not drop:
+        execute(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}", engine=engine)
+
+    for name in expired:
+        execute(f"ALTER TABLE {table_name} DETACH PARTITION {name}", engine=engine)
+        if drop:
+            execute(f"DROP TABLE {name}", engine=engine)
+        elif archive_schema:
+            execute(f"ALTER TABLE {name} SET SCHEMA {archive_schema}", engine=engine)
+
+    if expired:
+        action = (
+            "dropped" if drop else f"archived to {archive_schema}" if archive_schema else "kept"
+        )
+        logger.info(f"Detached {len(expired)} partitions of {table_name} ({action}).")
+    return expired
+
+
+def migrate_futures_ohlcv_to_partitions(
+    months_ahead: int = 3, drop_legacy: bool = False, engine: Engine = ENGINE
+) -> None:
+    """
+    Move ``futures_ohlcv`` from a single heap table to monthly range partitions.
+
+    Parameters
+    ----------
+    months_ahead : int, optional
+        How many future months to pre-create. Default is 3.
+    drop_legacy : bool, optional
+        Drop the old table after the swap instead of keeping it as
+        ``futures_ohlcv_legacy``. Default is False.
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
+
+    Notes
+    -----
+    The migration runs online:
+
+    1. A partitioned copy is created next to the live table.
+    2. Rows up to the current max ``id`` are copied one month per transaction,
+       so the live table stays readable and writable.
+    3. Under a short write lock the rows inserted meanwhile are copied and the
+       two tables are swapped by renaming.
+
+    Each step is idempotent, an interrupted migration can simply be re-run.
+    Duplicate ``(symbol, timestamp)`` rows in the old table are collapsed.
+    """
+    template = get_query_from_sql_file("queries/migrations/001_futures_ohlcv_partitioned.sql")
+    kind = relation_kind(TABLE_NAME, engine)
+
+    if kind == "p":
+        logger.info(f"{TABLE_NAME} is already partitioned.")
+        return
+
+    if kind is None:
+        execute(
+            format_sql(template, {"table": TABLE_NAME, "default_partition": DEFAULT_PARTITION}),
+            engine=engine,
+        )
+        ensure_partitions(months_ahead, engine=engine)
+        return
+
+    execute(
+        format_sql(template, {"table": STAGING_TABLE, "default_partition": DEFAULT_PARTITION}),
+        engine=engine,
+    )
+
+    bounds = select(
+        f"SELECT MAX(id) AS watermark, MIN(timestamp) AS first_ts FROM {TABLE_NAME}",
+        engine=engine,
+    )
+    watermark = bounds["watermark"].iloc[0]
+    first_ts = bounds["first_ts"].iloc[0]
+    watermark = 0 if pd.isna(watermark) else int(watermark)
+
+    if not pd.isna(first_ts):
+        ensure_partitions(months_ahead, start=first_ts, table_name=STAGING_TABLE, engine=engine)
+        month = month_start(first_ts)
+        last_month = add_months(_current_month(), months_ahead)
+        copy_query = f"""
+            INSERT INTO {STAGING_TABLE} ({OHLCV_COLUMNS})
+            SELECT {OHLCV_COLUMNS} FROM {TABLE_NAME}
+            WHERE id <= :watermark AND timestamp >= :lower AND timestamp < :upper
+            ON CONFLICT (symbol, timestamp) DO NOTHING
+        """
+        while month <= last_month:
+            execute(
+                format_sql(copy_query),
+                params={"watermark": watermark, "lower": month, "upper": add_months(month, 1)},
+                engine=engine,
+            )
+            month = add_months(month, 1)
+
+        # Rows outside the pre-created months land in the default partition
+        execute(
+            format_sql(
+                f"""
+                INSERT INTO {STAGING_TABLE} ({OHLCV_COLUMNS})
+                SELECT {OHLCV_COLUMNS} FROM {TABLE_NAME}
+                WHERE id <= :watermark AND timestamp >= :upper
+                ON CONFLICT (symbol, timestamp) DO NOTHING
+                """
+            ),
+            params={"watermark": watermark, "upper": add_months(last_month, 1)},
+            engine=engine,
+        )
+    else:
+        ensure_partitions(months_ahead, table_name=STAGING_TABLE, engine=engine)
+
+    delta_query = f"""
+        INSERT INTO {STAGING_TABLE} ({OHLCV_COLUMNS})
+        SELECT {OHLCV_COLUMNS} FROM {TABLE_NAME}
+        WHERE id > :watermark
+        ON CONFLICT (symbol, timestamp) DO NOTHING
+    """
+    rename_queries = [
+        f"ALTER TABLE {TABLE_NAME} RENAME TO {LEGACY_TABLE}",
+        f"ALTER INDEX IF EXISTS {TABLE_NAME}_pkey RENAME TO {LEGACY_TABLE}_pkey",
+        f"ALTER TABLE {STAGING_TABLE} RENAME TO {TABLE_NAME}",
+        f"ALTER INDEX IF EXISTS {STAGING_TABLE}_pkey RENAME TO {TABLE_NAME}_pkey",
+    ]
+    try:
+        with engine.connect() as connection:
+            with connection.begin():
+                # Block writers (not readers) while the last rows are copied over
+                connection.execute(text(f"LOCK TABLE {TABLE_NAME} IN SHARE ROW EXCLUSIVE MODE"))
+                connection.execute(text(format_sql(delta_query)), {"watermark": watermark})
+                for query in rename_queries:
+                    connection.execute(text(query))
+    except SQLAlchemyError as e:
+        logger.error(f"Error swapping {TABLE_NAME} to the partitioned table: {e}")
+        raise Exception(f"Error swapping {TABLE_NAME} to the partitioned table: {e}")
+
+    logger.info(f"Migrated {TABLE_NAME} to monthly partitions, old table kept as {LEGACY_TABLE}.")
+
+    if drop_legacy:
+        execute(f"DROP TABLE {LEGACY_TABLE}", engine=engine)
+        logger.info(f"Dropped {LEGACY_TABLE}.")
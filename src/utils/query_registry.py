@@ -0,0 +1,286 @@
+"""
+Module: query_registry.py
+Description: Registry of ``queries/*.sql`` files, loaded once and run with bound parameters.
+
+Query files use ``{name}`` (optionally quoted, ``'{name}'``) placeholders. At load time they are
+compiled to ``:name`` bind parameters, so the database sees one statement text per query
+regardless of the values and can reuse its plan. On PostgreSQL each query is additionally
+prepared once per pooled connection with ``PREPARE`` and run with ``EXECUTE``.
+"""
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.database import ENGINE
+from src.utils.loggerring import logger
+from src.utils.metrics import track_stage
+from src.utils.sql_operators import format_sql
+
+QUERIES_DIR = "queries"
+
+# Schema scripts that are not parameterised read queries
+EXCLUDED_FILES = ("init.sql",)
+
+PLACEHOLDER_PATTERN = re.compile(r"'?\{([^{}]*)\}'?")
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_]\w*$")
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    """
+    A query file compiled to bound-parameter form.
+
+    Attributes
+    ----------
+    name : str
+        File name without the ``.sql`` extension.
+    path : str
+        Path of the source file.
+    sql : str
+        Statement with ``:name`` bind parameters.
+    params : Tuple[str, ...]
+        Parameter names in order of first appearance.
+    prepared_sql : str
+        Statement with PostgreSQL positional ``$n`` parameters, used in ``PREPARE``.
+    """
+
+    name: str
+    path: str
+    sql: str
+    params: Tuple[str, ...]
+    prepared_sql: str
+
+    @property
+    def statement_name(self) -> str:
+        return f"q_{self.name}"
+
+
+@dataclass
+class QueryStats:
+    """
+    Call counters and latency of one registered query.
+    """
+
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    min_seconds: float = float("inf")
+    max_seconds: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        with self.lock:
+            self.calls += 1
+            self.errors += int(failed)
+            self.total_seconds += seconds
+            self.min_seconds = min(self.min_seconds, seconds)
+            self.max_seconds = max(self.max_seconds, seconds)
+
+
+def compile_query(name: str, path: str, query: str) -> CompiledQuery:
+    """
+    Compile the text of a query file to bound-parameter form and validate it.
+
+    Parameters
+    ----------
+    name : str
+        Query name.
+    path : str
+        Path of the source file, used in error messages.
+    query : str
+        Raw file contents.
+
+    Returns
+    -------
+    CompiledQuery
+
+    Raises
+    ------
+    ValueError
+        If the file is empty, holds more than one statement or has an invalid placeholder.
+    """
+    query = format_sql(query).rstrip(";").strip()
+    if not query:
+        raise ValueError(f"Query file {path} is empty")
+    if ";" in query:
+        raise ValueError(f"Query file {path} must contain a single statement")
+
+    params: List[str] = []
+
+    def to_bind(match: re.Match) -> str:
+        param = match.group(1).strip()
+        if not IDENTIFIER_PATTERN.match(param):
+            raise ValueError(f"Invalid placeholder {match.group(0)!r} in {path}")
+        if param not in params:
+            params.append(param)
+        return f":{param}"
+
+    sql = PLACEHOLDER_PATTERN.sub(to_bind, query)
+    prepared_sql = PLACEHOLDER_PATTERN.sub(
+        lambda match: f"${params.index(match.group(1).strip()) + 1}", query
+    )
+    return CompiledQuery(name, path, sql, tuple(params), prepared_sql)
+
+
+class QueryRegistry:
+    """
+    Loads every query file once and runs them with bound parameters.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory with ``*.sql`` files. Sub-directories (e.g. migrations) are ignored.
+        Default is "queries".
+    use_prepared : bool, optional
+        Use server-side prepared statements on PostgreSQL. Default is True.
+    """
+
+    def __init__(self, directory: str = QUERIES_DIR, use_prepared: bool = True):
+        self.directory = directory
+        self.use_prepared = use_prepared
+        self._queries: Dict[str, CompiledQuery] = {}
+        self._stats: Dict[str, QueryStats] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        (Re)load and compile all query files of the directory.
+        """
+        queries = {}
+        for file_name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, file_name)
+            if not file_name.endswith(".sql") or file_name in EXCLUDED_FILES:
+                continue
+            if not os.path.isfile(path):
+                continue
+
+            with open(path, "r", encoding="utf-8") as query_file:
+                name = file_name[: -len(".sql")]
+                queries[name] = compile_query(name, path, query_file.read())
+
+        self._queries = queries
+        self._stats = {name: self._stats.get(name, QueryStats()) for name in queries}
+        logger.info(f"Loaded {len(queries)} queries from {self.directory}")
+
+    def get(self, name: str) -> CompiledQuery:
+        """
+        Return a compiled query by name.
+
+        Raises
+        ------
+        ValueError
+            If no query with this name is registered.
+        """
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise ValueError(f"Unknown query: {name}")
+
+    def select(self, name: str, engine: Engine = ENGINE, **params: Any) -> pd.DataFrame:
+        """
+        Run a registered query and return the result as a DataFrame.
+
+        Parameters
+        ----------
+        name : str
+            Query name, i.e. the file name without ``.sql``.
+        engine : sqlalchemy.engine.Engine, optional
+            The SQLAlchemy engine to use. Default is the main engine.
+        **params
+            Values for the query placeholders.
+
+        Returns
+        -------
+        pd.DataFrame
+
+        Raises
+        ------
+        ValueError
+            If parameters are missing or unexpected.
+        Exception
+            If there is an error executing the query.
+        """
+        query = self.get(name)
+        if set(params) != set(query.params):
+            raise ValueError(
+                f"Query {name} expects parameters {list(query.params)}, got {sorted(params)}"
+            )
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            with track_stage("select", symbol=params.get("symbol"), table=name) as stage:
+                with engine.connect() as connection:
+                    if self.use_prepared and engine.dialect.name == "postgresql":
+                        result = self._select_prepared(connection, query, params)
+                    else:
+                        result = pd.read_sql(text(query.sql), connection, params=params)
+                stage.add_rows(len(result))
+            return result
+
+        except SQLAlchemyError as e:
+            failed = True
+            logger.error(f"Error executing query {name}: {e}")
+            raise Exception(f"Error executing query {name}: {e}")
+
+        finally:
+            self._stats[name].record(time.perf_counter() - started, failed)
+
+    def _select_prepared(
+        self, connection, query: CompiledQuery, params: Dict[str, Any]
+    ) -> pd.DataFrame:
+        # Connection.info lives as long as the pooled DBAPI connection, like the prepared statement
+        prepared = connection.info.setdefault("prepared_queries", set())
+        if query.statement_name not in prepared:
+            connection.execute(text(f"PREPARE {query.statement_name} AS {query.prepared_sql}"))
+            prepared.add(query.statement_name)
+
+        arguments = ", ".join(f":{param}" for param in query.params)
+        execute_sql = f"EXECUTE {query.statement_name}"
+        if arguments:
+            execute_sql += f"({arguments})"
+        try:
+            return pd.read_sql(text(execute_sql), connection, params=params)
+        except SQLAlchemyError:
+            # Drop the DBAPI connection so the pool does not hand out a stale prepared statement
+            connection.invalidate()
+            raise
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Per-query call counts and latency in milliseconds.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns ``query``, ``calls``, ``errors``, ``mean_ms``, ``min_ms``, ``max_ms``
+            and ``total_ms``.
+        """
+        rows = []
+        for name, stats in self._stats.items():
+            with stats.lock:
+                rows.append(
+                    {
+                        "query": name,
+                        "calls": stats.calls,
+                        "errors": stats.errors,
+                        "mean_ms": 1000 * stats.total_seconds / stats.calls if stats.calls else 0.0,
+                        "min_ms": 1000 * stats.min_seconds if stats.calls else 0.0,
+                        "max_ms": 1000 * stats.max_seconds,
+                        "total_ms": 1000 * stats.total_seconds,
+                    }
+                )
+        return pd.DataFrame(
+            rows, columns=["query", "calls", "errors", "mean_ms", "min_ms", "max_ms", "total_ms"]
+        )
+
+
+QUERIES = QueryRegistry()
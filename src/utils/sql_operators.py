@@ -1,14 +1,56 @@
 """Module for handling database operations using SQLAlchemy."""
 
 from textwrap import dedent
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
 
 import pandas as pd
-from sqlalchemy import Engine, text
+from sqlalchemy import Engine, TextClause, bindparam, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
 
 from config.database import ENGINE
 from src.utils.loggerring import logger
+from src.utils.metrics import track_stage
+
+# Called with (table_name, data) after every successful write, see add_write_listener
+WriteListener = Callable[[str, pd.DataFrame], None]
+_write_listeners: List[WriteListener] = []
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def add_write_listener(listener: WriteListener) -> None:
+    """
+    Register a callback run after every successful ``upload`` or ``notify_write``.
+
+    Parameters
+    ----------
+    listener : Callable[[str, pd.DataFrame], None]
+        Called with the table name and the uploaded rows, e.g. to invalidate caches.
+        Exceptions raised by the listener are logged and do not fail the upload.
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def notify_write(table_name: str, data: Optional[pd.DataFrame] = None) -> None:
+    """
+    Run the write listeners for rows written without ``upload`` (COPY, UPDATE, ...).
+
+    Parameters
+    ----------
+    table_name : str
+        Written table.
+    data : pd.DataFrame, optional
+        Written rows, or at least their ``symbol`` column. Default is the whole table.
+    """
+    data = pd.DataFrame() if data is None else data
+    for listener in _write_listeners:
+        try:
+            listener(table_name, data)
+        except Exception as e:
+            logger.error(f"Write listener {listener.__name__} failed for {table_name}: {e}")
 
 
 def get_query_from_sql_file(query_file_path: str) -> str:
@@ -54,14 +96,19 @@ def format_sql(query: str, params: Optional[Dict[str, Any]] = None) -> str:
     return formatted_query
 
 
-def select(query: str, engine: Engine = ENGINE) -> pd.DataFrame:
+def select(
+    query: Union[str, TextClause], params: Optional[Dict[str, Any]] = None, engine: Engine = ENGINE
+) -> pd.DataFrame:
     """
     Execute a SQL query and return the result as a DataFrame.
 
     Parameters
     ----------
-    query : str
-        The SQL query to execute.
+    query : str or sqlalchemy.TextClause
+        The SQL query to execute, a ``TextClause`` for queries needing typed bind parameters
+        (e.g. expanding ``IN`` lists).
+    params : dict, optional
+        Bound parameters referenced in the query as ``:name``.
     engine : sqlalchemy.engine.Engine, optional
         The SQLAlchemy engine to use. Default is the main engine.
 
@@ -78,7 +125,8 @@ def select(query: str, engine: Engine = ENGINE) -> pd.DataFrame:
 
     try:
         with engine.connect() as connection:
-            result = pd.read_sql(text(query), connection)
+            query = text(query) if isinstance(query, str) else query
+            result = pd.read_sql(query, connection, params=params)
         return result
 
     except SQLAlchemyError as e:
@@ -86,7 +134,7 @@ def select(query: str, engine: Engine = ENGINE) -> pd.DataFrame:
         raise Exception(f"Error executing query: {e}")
 
 
-def execute(query: str, engine: Engine = ENGINE) -> None:
+def execute(query: str, params: Optional[Dict[str, Any]] = None, engine: Engine = ENGINE) -> None:
     """
     Execute a SQL query on the production database.
 
@@ -94,6 +142,8 @@ def execute(query: str, engine: Engine = ENGINE) -> None:
     ----------
     query : str
         The SQL query to execute.
+    params : dict, optional
+        Bound parameters referenced in the query as ``:name``.
     engine : sqlalchemy.engine.Engine, optional
         The SQLAlchemy engine to use. Default is the main
 
@@ -105,18 +155,35 @@ def execute(query: str, engine: Engine = ENGINE) -> None:
     try:
         with engine.connect() as connection:
             with connection.begin():
-                connection.execute(text(query))
+                connection.execute(text(query), params or {})
     except SQLAlchemyError as e:
         logger.error(f"Error executing query: {e}")
         raise Exception(f"Error executing query: {e}")
 
 
+def insert_on_conflict_do_nothing(table, connection, keys: List[str], data_iter) -> int:
+    """
+    ``DataFrame.to_sql`` method sending a multi-row INSERT that skips rows whose key exists.
+
+    Returns
+    -------
+    int
+        Number of inserted rows.
+    """
+    insert = _CONFLICT_INSERTS[connection.dialect.name]
+    rows = [dict(zip(keys, row)) for row in data_iter]
+    statement = insert(table.table).values(rows).on_conflict_do_nothing()
+    return connection.execute(statement).rowcount
+
+
 def upload(
     data: pd.DataFrame,
     table_name: str,
     schema: str = "public",
     if_exists: Literal["fail", "replace", "append"] = "append",
     engine: Engine = ENGINE,
+    chunksize: Optional[int] = 1000,
+    ignore_conflicts: bool = False,
 ) -> None:
     """
     Upload data to a database table.
@@ -137,64 +204,108 @@ def upload(
         Default is "append".
     engine : sqlalchemy.engine.Engine, optional
         The SQLAlchemy engine to use. Default is the main engine.
+    chunksize : int, optional
+        Rows per multi-row INSERT statement. Default is 1000, None sends all rows at once.
+    ignore_conflicts : bool, optional
+        Skip rows whose primary key already exists instead of failing. Default is False.
 
     Raises
     ------
     Exception
         If there is an error uploading the data.
     """
+    symbol = data["symbol"].iloc[0] if "symbol" in data and not data.empty else None
     try:
-        with engine.connect() as connection:
+        with track_stage(
+            "write", symbol=symbol, table=table_name
+        ) as stage, engine.connect() as connection:
             data.to_sql(
                 table_name,
                 connection,
                 schema=schema,
                 index=False,
                 if_exists=if_exists,
-                method="multi",
+                method=insert_on_conflict_do_nothing if ignore_conflicts else "multi",
+                chunksize=chunksize,
             )
+            stage.add_rows(len(data))
     except SQLAlchemyError as e:
         logger.error(f"Error uploading data: {e}")
         raise Exception(f"Error uploading data: {e}")
 
+    notify_write(table_name, data)
+
 
 def upload_without_duplicates(
-    data_df: pd.DataFrame, table_name: Literal["crypto_news", "futures_ohlcv"] = "crypto_news"
+    data_df: pd.DataFrame,
+    table_name: Literal["crypto_news", "futures_ohlcv"] = "crypto_news",
+    engine: Engine = ENGINE,
 ):
     """
-    Upload news data to database, avoiding duplicate entries based on id.
+    Upload data to database, avoiding duplicate entries based on the table key.
 
     Parameters
     ----------
     data_df : pd.DataFrame
-        DataFrame containing news data.
+        DataFrame containing news or OHLCV data.
     table_name : Literal["crypto_news", "futures_ohlcv"]
         Name of the table to upload to. Default is "crypto_news".
+    engine : sqlalchemy.engine.Engine, optional
+        The SQLAlchemy engine to use. Default is the main engine.
 
     Raises
     ------
     ValueError
         If the table name is not recognized.
+
+    Notes
+    -----
+    For ``futures_ohlcv`` the lookup of existing keys is bounded to the symbols and time
+    range of ``data_df`` so that only the matching monthly partitions are scanned. Empty
+    data is not looked up at all. Rows stored by
+    a concurrent upload between the lookup and the insert are skipped by the insert.
     """
     source_index = {
-        "crypto_news": "id",
-        "futures_ohlcv": "timestamp",
+        "crypto_news": ["id"],
+        "futures_ohlcv": ["symbol", "timestamp"],
     }
 
-    index_column = source_index.get(table_name)
-    if not index_column:
+    index_columns = source_index.get(table_name)
+    if not index_columns:
         raise ValueError(f"Unknown table name: {table_name}")
 
-    existing_ids_query = f"SELECT {index_column} FROM {table_name}"
-    existing_ids_df = select(existing_ids_query)
-    if existing_ids_df.empty:
-        new_data = data_df
-    else:
-        existing_ids = set(existing_ids_df[index_column].tolist())
-        new_data = data_df[~data_df[index_column].isin(existing_ids)]
+    if data_df.empty:
+        logger.warning(f"No new entries to add to {table_name} table.")
+        return
+
+    existing_ids_query = text(f"SELECT {', '.join(index_columns)} FROM {table_name}")
+    params = None
+    if table_name == "futures_ohlcv":
+        existing_ids_query = text(
+            "SELECT symbol, timestamp FROM futures_ohlcv"
+            " WHERE timestamp BETWEEN :start AND :end AND symbol IN :symbols"
+        ).bindparams(bindparam("symbols", expanding=True))
+        params = {
+            "start": data_df["timestamp"].min().to_pydatetime(),
+            "end": data_df["timestamp"].max().to_pydatetime(),
+            "symbols": data_df["symbol"].unique().tolist(),
+        }
+
+    symbol = data_df["symbol"].iloc[0] if "symbol" in data_df else None
+    with track_stage("dedup", symbol=symbol, table=table_name) as stage:
+        existing_ids_df = select(existing_ids_query, params=params, engine=engine)
+        if existing_ids_df.empty:
+            new_data = data_df
+        else:
+            # Drivers without typed results (e.g. SQLite) return the keys as strings
+            existing_ids_df = existing_ids_df.astype(data_df[index_columns].dtypes.to_dict())
+            existing_ids = pd.MultiIndex.from_frame(existing_ids_df[index_columns])
+            new_ids = pd.MultiIndex.from_frame(data_df[index_columns])
+            new_data = data_df[~new_ids.isin(existing_ids)]
+        stage.add_rows(len(existing_ids_df))
 
     if not new_data.empty:
-        upload(new_data, table_name, if_exists="append")
+        upload(new_data, table_name, if_exists="append", engine=engine, ignore_conflicts=True)
         logger.info(f"Added {len(new_data)} new entries to {table_name} table.")
     else:
         logger.warning(f"No new entries to add to {table_name} table.")
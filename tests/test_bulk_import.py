@@ -0,0 +1,86 @@
+import pandas as pd
+
+from src.lib.bulk_import import normalize_timestamps, prepare_news, prepare_ohlcv
+
+
+def test_normalize_timestamps_mixed_offset_and_naive_strings():
+    values = pd.Series(
+        [
+            "2024-01-01T02:00:00+02:00",
+            "2024-01-01 00:00:00",
+            "2024-01-01T00:00:00Z",
+            "2024-01-01T05:00:00-0500",
+            "2024-01-02",
+        ]
+    )
+
+    result = normalize_timestamps(values)
+
+    expected = pd.to_datetime(
+        [
+            "2024-01-01 00:00:00",
+            "2024-01-01 00:00:00",
+            "2024-01-01 00:00:00",
+            "2024-01-01 10:00:00",
+            "2024-01-02 00:00:00",
+        ]
+    )
+    assert result.dt.tz is None
+    assert result.tolist() == expected.tolist()
+
+
+def test_normalize_timestamps_naive_strings_before_offset_strings():
+    values = pd.Series(["2024-01-01 03:00:00", "2024-01-01T00:00:00+01:00"])
+
+    result = normalize_timestamps(values)
+
+    assert result.tolist() == [pd.Timestamp("2024-01-01 03:00"), pd.Timestamp("2023-12-31 23:00")]
+
+
+def test_normalize_timestamps_unix_seconds_and_milliseconds():
+    seconds = normalize_timestamps(pd.Series([1704067200, 1704067260]))
+    milliseconds = normalize_timestamps(pd.Series([1704067200000, 1704067260000]))
+
+    assert seconds.tolist() == milliseconds.tolist()
+    assert seconds.iloc[0] == pd.Timestamp("2024-01-01 00:00")
+
+
+def test_normalize_timestamps_missing_and_unparsable_values_become_nat():
+    strings = normalize_timestamps(pd.Series(["2024-01-01 00:00:00", None, "not a date"]))
+    numbers = normalize_timestamps(pd.Series(["1704067200000", None]))
+
+    assert strings.isna().tolist() == [False, True, True]
+    assert numbers.tolist()[0] == pd.Timestamp("2024-01-01 00:00")
+    assert pd.isna(numbers.iloc[1])
+
+
+def test_prepare_ohlcv_drops_rows_without_timestamp():
+    chunk = pd.DataFrame(
+        {
+            "symbol": ["BTC/USDT:USDT"] * 3,
+            "timestamp": ["2024-01-01T00:00:00Z", "", "2024-01-01T01:00:00Z"],
+            "close": [1.0, 2.0, 3.0],
+        }
+    )
+
+    result = prepare_ohlcv(chunk, None)
+
+    assert result["close"].tolist() == [1.0, 3.0]
+    assert result["timestamp"].notna().all()
+
+
+def test_prepare_news_drops_rows_without_publication_time():
+    chunk = pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "title": ["a", "b", "c"],
+            "url": ["u1", "u2", "u3"],
+            "published_at": ["2024-01-01T00:00:00Z", None, "garbage"],
+        }
+    )
+
+    result = prepare_news(chunk)
+
+    assert result["id"].tolist() == [1]
+    assert result["published_at"].tolist() == [1704067200]
+    assert result["cluster_id"].tolist() == [1]
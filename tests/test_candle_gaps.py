@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.lib import candle_gaps
+from src.lib.candle_gaps import gap_coverage, merge_gaps, repair_gaps
+
+START = datetime(2024, 1, 1)
+
+
+def hour(n: int) -> datetime:
+    return START + timedelta(hours=n)
+
+
+def gaps(*ranges) -> pd.DataFrame:
+    return pd.DataFrame(
+        [(hour(first), hour(last), last - first + 1) for first, last in ranges],
+        columns=["gap_start", "gap_end", "missing_hours"],
+    )
+
+
+@pytest.fixture
+def empty_engine():
+    engine = create_engine("sqlite://")
+    pd.DataFrame(
+        {"symbol": pd.Series(dtype="string"), "timestamp": pd.Series(dtype="object")}
+    ).to_sql("futures_ohlcv", engine, index=False)
+    return engine
+
+
+def test_merge_gaps_joins_neighbours_within_a_page():
+    windows = merge_gaps(gaps((10, 12), (2, 3), (20, 20)), page_limit=24)
+
+    assert windows == [(hour(2), hour(20))]
+
+
+def test_merge_gaps_keeps_distant_and_long_gaps_apart():
+    windows = merge_gaps(gaps((0, 1), (30, 31), (40, 100)), page_limit=24)
+
+    assert windows == [(hour(0), hour(1)), (hour(30), hour(31)), (hour(40), hour(100))]
+
+
+def test_merge_gaps_without_gaps():
+    assert merge_gaps(gaps()) == []
+
+
+def test_gap_coverage_counts_missing_hours(monkeypatch):
+    monkeypatch.setattr(candle_gaps, "find_gaps", lambda *args, **kwargs: gaps((2, 3), (7, 7)))
+
+    report = gap_coverage("BTC/USDT:USDT", hour(0), hour(9))
+
+    assert report == {
+        "symbol": "BTC/USDT:USDT",
+        "start": hour(0),
+        "end": hour(9),
+        "expected_hours": 10,
+        "missing_hours": 3,
+        "gaps": 2,
+        "coverage": 0.7,
+    }
+
+
+def test_gap_coverage_has_the_same_keys_without_candles(monkeypatch, empty_engine):
+    monkeypatch.setattr(candle_gaps, "find_gaps", lambda *args, **kwargs: gaps())
+    with_data = gap_coverage("BTC/USDT:USDT", hour(0), hour(9))
+
+    no_data = gap_coverage("BTC/USDT:USDT", end=hour(9), engine=empty_engine)
+    empty_range = gap_coverage("BTC/USDT:USDT", hour(9), hour(0))
+
+    assert no_data.keys() == with_data.keys() == empty_range.keys()
+    assert (no_data["start"], no_data["end"], no_data["coverage"]) == (None, hour(9), 0.0)
+    assert (empty_range["start"], empty_range["end"]) == (hour(9), hour(0))
+
+
+def test_repair_gaps_without_candles_reports_coverage_keys(empty_engine):
+    report = repair_gaps("BTC/USDT:USDT", end=hour(9), engine=empty_engine)
+
+    assert set(gap_coverage("BTC/USDT:USDT", hour(9), hour(0))) <= set(report)
+    assert (report["windows"], report["repaired_hours"], report["coverage_after"]) == (0, 0, 0.0)
@@ -0,0 +1,134 @@
+import time
+
+import pandas as pd
+import pytest
+
+from src.main import app as api
+from src.utils import http_cache
+from src.utils.http_cache import ResponseCache, etag_matches, invalidate_on_write, make_etag
+
+KEY = ("futures_ohlcv", "BTC/USDT:USDT", 200)
+
+
+def put(cache: ResponseCache, key, body: bytes = b"{}"):
+    return cache.put(key, make_etag(*key, body), body, cache.generation(key))
+
+
+def test_make_etag_is_stable_and_quoted():
+    assert make_etag("crypto_news", "*", 1) == make_etag("crypto_news", "*", 1)
+    assert make_etag("crypto_news", "*", 1) != make_etag("crypto_news", "*", 2)
+    assert make_etag("x").startswith('"') and make_etag("x").endswith('"')
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"other", "abc"', True),
+        ("*", True),
+        ('"other"', False),
+    ],
+)
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+    put(cache, KEY)
+
+    assert cache.get(KEY) is not None
+    time.sleep(0.06)
+    assert cache.get(KEY) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=30)
+    first, second, third = [("crypto_news", "*", n) for n in range(3)]
+    put(cache, first)
+    put(cache, second)
+
+    cache.get(first)
+    put(cache, third)
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_load_started_before_a_write_is_not_stored():
+    cache = ResponseCache(max_entries=10, ttl_seconds=30)
+    generation = cache.generation(KEY)
+
+    cache.invalidate("futures_ohlcv", ["BTC/USDT:USDT"])
+    entry = cache.put(KEY, '"stale"', b"{}", generation)
+
+    assert entry.etag == '"stale"'
+    assert cache.get(KEY) is None
+
+
+def test_invalidate_drops_written_scopes_and_table_wide_entries():
+    cache = ResponseCache(max_entries=10, ttl_seconds=30)
+    eth = ("futures_ohlcv", "ETH/USDT:USDT", 200)
+    table_wide = ("futures_ohlcv", http_cache.ALL_SCOPES)
+    news = ("crypto_news", http_cache.ALL_SCOPES)
+    for key in (KEY, eth, table_wide, news):
+        put(cache, key)
+
+    assert cache.invalidate("futures_ohlcv", ["BTC/USDT:USDT"]) == 2
+
+    assert cache.get(KEY) is None and cache.get(table_wide) is None
+    assert cache.get(eth) is not None and cache.get(news) is not None
+
+
+def test_write_listener_invalidates_by_symbol(monkeypatch):
+    cache = ResponseCache(max_entries=10, ttl_seconds=30)
+    monkeypatch.setattr(http_cache, "CACHE", cache)
+    eth = ("futures_ohlcv", "ETH/USDT:USDT", 200)
+    put(cache, KEY)
+    put(cache, eth)
+
+    invalidate_on_write("futures_ohlcv", pd.DataFrame({"symbol": ["BTC/USDT:USDT"]}))
+
+    assert cache.get(KEY) is None
+    assert cache.get(eth) is not None
+
+
+def test_cached_read_answers_if_none_match_with_304(monkeypatch):
+    cache = ResponseCache(max_entries=10, ttl_seconds=30)
+    monkeypatch.setattr(api, "CACHE", cache)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return pd.DataFrame({"published_at": [1, 2], "title": ["a", "b"]})
+
+    first = api._cached_read(("crypto_news", "*"), None, load, "published_at")
+    etag = first.headers["ETag"]
+    revalidated = api._cached_read(("crypto_news", "*"), etag, load, "published_at")
+    changed = api._cached_read(("crypto_news", "*"), '"other"', load, "published_at")
+
+    assert first.status_code == 200 and b'"title":"a"' in first.body
+    assert revalidated.status_code == 304 and revalidated.headers["ETag"] == etag
+    assert changed.status_code == 200
+    assert len(loads) == 1
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_cached_read_reloads_after_a_write(monkeypatch):
+    cache = ResponseCache(max_entries=10, ttl_seconds=30)
+    monkeypatch.setattr(api, "CACHE", cache)
+    rows = iter([pd.DataFrame({"published_at": [1]}), pd.DataFrame({"published_at": [1, 2]})])
+
+    def load():
+        return next(rows)
+
+    etag = api._cached_read(("crypto_news", "*"), None, load, "published_at").headers["ETag"]
+    cache.invalidate("crypto_news")
+    response = api._cached_read(("crypto_news", "*"), etag, load, "published_at")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.lib import news_dedup
+from src.lib.news_dedup import NewsDeduplicator, cluster_representatives, shingle_hashes
+
+HOUR = 3600
+TITLE = "Bitcoin surges past $70,000 as spot ETF inflows hit a record"
+
+
+@pytest.fixture
+def index():
+    return NewsDeduplicator(threshold=0.5, window_hours=24)
+
+
+def test_reworded_titles_join_the_first_cluster(index):
+    first = index.add(1, TITLE, 0)
+    reworded = index.add(2, "Bitcoin surges past $70,000 as spot ETF inflows hit record", HOUR)
+    other = index.add(3, "Ethereum developers schedule the next network upgrade", HOUR)
+
+    assert (first, reworded, other) == (1, 1, 3)
+    assert index.stats()["duplicates"] == 1
+
+
+def test_known_item_keeps_its_cluster(index):
+    index.add(1, TITLE, 0)
+
+    assert index.add(1, "Completely different title now", HOUR) == 1
+
+
+def test_titles_shorter_than_a_shingle_get_their_own_cluster(index):
+    assert len(shingle_hashes("")) == 0
+    assert len(shingle_hashes("btc")) == 0
+
+    clusters = [
+        index.add(news_id, title, 0) for news_id, title in enumerate(["", "", "btc", "btc"])
+    ]
+
+    assert clusters == [0, 1, 2, 3]
+    assert index.stats()["duplicates"] == 0
+
+
+def test_items_older_than_the_window_are_evicted(index):
+    index.add(1, TITLE, 0)
+    index.add(2, "Ethereum developers schedule the next network upgrade", 25 * HOUR)
+
+    assert index.add(3, TITLE, 25 * HOUR) == 3
+    assert index.stats()["indexed"] == 2
+
+
+def test_assign_orders_by_publication_and_keeps_the_frame_index(index, monkeypatch):
+    monkeypatch.setattr(index, "warm_up", lambda engine=None: 0)
+    news = pd.DataFrame(
+        {"id": [20, 10], "title": [TITLE + "!", TITLE], "published_at": [HOUR, 0]},
+        index=["b", "a"],
+    )
+
+    clusters = index.assign(news)
+
+    assert clusters.to_dict() == {"b": 10, "a": 10}
+
+
+def test_cluster_representatives_keep_the_earliest_item():
+    news = pd.DataFrame({"id": [3, 1, 2], "published_at": [5, 1, 3], "cluster_id": [1, 1, 2]})
+
+    assert cluster_representatives(news)["id"].tolist() == [1, 2]
+
+
+def test_recluster_news_reloads_the_shared_index(monkeypatch):
+    engine = create_engine("sqlite://")
+    now = int(pd.Timestamp.now(tz="UTC").timestamp())
+    pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "title": [TITLE, TITLE + " - report", "Solana outage halts block production"],
+            "published_at": [now - 2 * HOUR, now - HOUR, now],
+            "cluster_id": [1, 2, 3],
+        }
+    ).to_sql("crypto_news", engine, index=False)
+
+    shared = NewsDeduplicator(threshold=0.5, window_hours=24)
+    shared.warm_up(engine)
+    monkeypatch.setattr(news_dedup, "NEWS_DEDUP", shared)
+
+    result = news_dedup.recluster_news(engine=engine)
+
+    stored = pd.read_sql("SELECT id, cluster_id FROM crypto_news ORDER BY id", engine)
+    assert stored["cluster_id"].tolist() == [1, 1, 3]
+    assert result["clusters"] == 2
+    # A new rewording joins the reclustered story, not the stale cluster 2
+    assert shared.add(4, TITLE + " - report!", now) == 1
@@ -0,0 +1,79 @@
+import re
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from src.utils.query_registry import QUERIES_DIR, QueryRegistry, compile_query
+
+
+def test_placeholders_become_named_and_positional_parameters():
+    query = compile_query(
+        "futures_range",
+        "futures_range.sql",
+        "SELECT * FROM futures_ohlcv\n"
+        "WHERE symbol = '{symbol}' AND timestamp >= {start} AND timestamp <= { end }\n"
+        "AND symbol <> '{symbol}';",
+    )
+
+    assert query.params == ("symbol", "start", "end")
+    assert query.sql == (
+        "SELECT * FROM futures_ohlcv\n"
+        "WHERE symbol = :symbol AND timestamp >= :start AND timestamp <= :end\n"
+        "AND symbol <> :symbol"
+    )
+    assert query.prepared_sql == (
+        "SELECT * FROM futures_ohlcv\n"
+        "WHERE symbol = $1 AND timestamp >= $2 AND timestamp <= $3\n"
+        "AND symbol <> $1"
+    )
+    assert query.statement_name == "q_futures_range"
+
+
+def test_query_without_placeholders_is_unchanged():
+    query = compile_query("news_watermark", "news_watermark.sql", "  SELECT 1  ")
+
+    assert (query.sql, query.prepared_sql, query.params) == ("SELECT 1", "SELECT 1", ())
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("", "empty"),
+        ("SELECT 1; SELECT 2", "single statement"),
+        ("SELECT * FROM t WHERE a = {1a}", "Invalid placeholder"),
+        ("SELECT * FROM t WHERE a = '{a b}'", "Invalid placeholder"),
+    ],
+)
+def test_invalid_query_files_are_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        compile_query("bad", "bad.sql", text)
+
+
+def test_every_repository_query_compiles_and_lists_its_columns():
+    registry = QueryRegistry()
+    names = [path.stem for path in Path(QUERIES_DIR).glob("*.sql") if path.name != "init.sql"]
+
+    assert "latest_news" in names
+    for name in names:
+        query = registry.get(name)
+        # Prepared statements are reused per connection, a column change under
+        # SELECT * would fail them with "cached plan must not change result type"
+        assert not re.search(r"SELECT\s+\*", query.sql, re.IGNORECASE), name
+        assert "{" not in query.sql, name
+
+
+def test_select_checks_the_parameters_before_running():
+    registry = QueryRegistry()
+
+    with pytest.raises(ValueError, match="expects parameters"):
+        registry.select("latest_futures_data", engine=create_engine("sqlite://"))
+
+
+def test_select_binds_parameters_outside_postgresql(tmp_path):
+    (tmp_path / "echo.sql").write_text("SELECT '{symbol}' AS symbol, {limit} AS n")
+    registry = QueryRegistry(directory=str(tmp_path))
+
+    result = registry.select("echo", engine=create_engine("sqlite://"), symbol="BTC", limit=3)
+
+    assert result.to_dict(orient="records") == [{"symbol": "BTC", "n": 3}]
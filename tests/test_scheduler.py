@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.lib.scheduler import SingleFlight
+from src.utils.loggerring import correlation_id, log_context
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def blocking(release: threading.Event, calls: list, value):
+    calls.append(("start", value))
+    release.wait(5)
+    calls.append(("end", value))
+    return value
+
+
+def test_identical_calls_are_joined(executor):
+    group, release, calls = SingleFlight(executor), threading.Event(), []
+
+    first = group.submit("futures:BTC", blocking, release, calls, 1)
+    second = group.submit("futures:BTC", blocking, release, calls, 1)
+    release.set()
+
+    assert second is first
+    assert first.result(5) == 1
+    assert calls == [("start", 1), ("end", 1)]
+
+
+def test_other_calls_of_a_key_run_one_after_another(executor):
+    group, release, calls = SingleFlight(executor), threading.Event(), []
+
+    first = group.submit("futures:BTC", blocking, release, calls, 1)
+    second = group.submit("futures:BTC", blocking, release, calls, 2)
+    release.set()
+
+    assert [first.result(5), second.result(5)] == [1, 2]
+    assert calls == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+
+def test_queued_calls_do_not_hold_workers(executor):
+    group, release, calls = SingleFlight(executor), threading.Event(), []
+
+    group.submit("futures:BTC", blocking, release, calls, 1)
+    queued = [group.submit("futures:BTC", blocking, release, calls, n) for n in (2, 3, 4)]
+
+    # Both workers would be taken by waiting calls if the queue blocked them
+    assert group.submit("news:BTC", lambda: "news").result(5) == "news"
+    release.set()
+    assert [future.result(5) for future in queued] == [2, 3, 4]
+
+
+def test_cancelled_queued_call_keeps_the_order(executor):
+    group, release, calls = SingleFlight(executor), threading.Event(), []
+
+    first = group.submit("futures:BTC", blocking, release, calls, 1)
+    second = group.submit("futures:BTC", blocking, release, calls, 2)
+    assert second.cancel()
+    third = group.submit("futures:BTC", blocking, release, calls, 3)
+
+    assert not third.done()
+    release.set()
+    assert [first.result(5), third.result(5)] == [1, 3]
+    assert calls == [("start", 1), ("end", 1), ("start", 3), ("end", 3)]
+
+
+def test_calls_keep_the_correlation_id_of_the_caller(executor):
+    group = SingleFlight(executor)
+
+    with log_context("req-123"):
+        future = group.submit("futures:BTC", correlation_id.get)
+
+    assert future.result(5) == "req-123"
+
+
+def test_errors_reach_the_caller_and_release_the_key(executor):
+    group = SingleFlight(executor)
+
+    def fail():
+        raise ValueError("exchange down")
+
+    with pytest.raises(ValueError, match="exchange down"):
+        group.do("futures:BTC", fail)
+    assert group.do("futures:BTC", lambda: "ok") == "ok"